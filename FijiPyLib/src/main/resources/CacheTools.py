@@ -0,0 +1,119 @@
+'''
+CacheTools Module
+
+This module contains tools for remembering results that are slow to
+compute, so they don't need to be computed again
+
+    boundedCache(maxSize)
+
+        - Class of objects that remember a limited number of values,
+          forgetting the oldest ones once they're full
+
+'''
+
+########################################################################
+########################### IMPORT PACKAGES ############################
+########################################################################
+
+# Import threading so we can stop several threads from changing a cache
+# at once
+import threading
+
+########################################################################
+############################# boundedCache #############################
+########################################################################
+
+# Define a class of objects that remember a limited number of values
+class boundedCache:
+    '''
+    Class of objects that remember a limited number of values under
+    their keys, forgetting the value stored the longest time ago once
+    they're full. Caches can be shared between threads. Stores the
+    following attributes:
+
+        * maxSize (int): Most values the cache will remember
+
+        * entries (dictionary): Values stored in the cache under their
+                                keys
+
+        * order (list): Keys of the values in the order they were
+                        stored
+
+    boundedCache(maxSize)
+
+        - maxSize (int): Most values you want the cache to remember
+
+    METHODS
+
+        - get(key,default=None): Returns the value stored under key, or
+                                 default if there isn't one
+
+        - put(key,value): Stores value under key, forgetting the oldest
+                          value if the cache is full
+
+        - remove(key): Forgets the value stored under key, if there is
+                       one
+
+        - keys(): Returns a list of the keys currently stored, oldest
+                  first
+
+    AR Oct 2026
+    '''
+
+    # Initialize object
+    def __init__(self,maxSize):
+
+        # Store the most values we'll remember, and start with an empty
+        # cache
+        self.maxSize = maxSize
+        self.entries = {}
+        self.order = []
+
+        # Initialize a lock so that only one thread at a time can change
+        # the cache
+        self.lock = threading.Lock()
+
+    # Define a method that looks up a value in the cache
+    def get(self,key,default=None):
+
+        # Return the value stored under this key, if there is one
+        with self.lock:
+            return self.entries.get(key,default)
+
+    # Define a method that stores a value in the cache
+    def put(self,key,value):
+
+        # Hold the lock while we change the cache, so that two threads
+        # storing the same key can't both add it to our order list
+        with self.lock:
+
+            # If this key is already stored, just replace its value
+            if key in self.entries:
+                self.entries[key] = value
+                return
+
+            # If the cache is full, forget the value we stored the
+            # longest time ago
+            if len(self.order) >= self.maxSize:
+                del self.entries[self.order.pop(0)]
+
+            # Store the value under its key
+            self.entries[key] = value
+            self.order.append(key)
+
+    # Define a method that removes a value from the cache
+    def remove(self,key):
+
+        # Forget the value stored under this key, if there is one
+        with self.lock:
+            if key in self.entries:
+                del self.entries[key]
+                self.order.remove(key)
+
+    # Define a method that lists the keys stored in the cache
+    def keys(self):
+
+        # Return a copy of the keys, so the cache can still change while
+        # the caller uses them
+        with self.lock:
+            return list(self.order)
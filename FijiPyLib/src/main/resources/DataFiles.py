@@ -12,6 +12,16 @@ data files
 
         - Reads a csv file to a python dictionary
 
+    forgetCSV(csvPath)
+
+        - Removes every version of a csv file from csv2dict's cache of
+          files that have already been read
+
+    readCSV(csvPath)
+
+        - Reads a csv file to a python dictionary without checking
+          csv2dict's cache of files that have already been read
+
     getNElementsInDict(dic)
 
         - Returns the number of elements in the python dictionary,
@@ -36,8 +46,47 @@ data files
 # Import csv so we can read and write csv files
 import csv
 
-# Import izip so we can iterate across multiple lists
-from itertools import izip
+# Import sys so we can check which version of python we're running, and
+# os so we can check when files were last modified and their size
+import sys
+import os
+
+# Import boundedCache so we can remember the csv files we've read
+from CacheTools import boundedCache
+
+# Import izip so we can iterate across multiple lists, and izip_longest
+# so we can iterate across lists that may have different lengths. Also
+# store how to iterate across the values of a dictionary without making
+# a list of them.
+try:
+    from itertools import izip, izip_longest
+    itervalues = dict.itervalues
+
+# Python 3's zip and dict.values are already lazy, so it no longer has
+# izip or itervalues
+except ImportError:
+    izip = zip
+    from itertools import zip_longest as izip_longest
+    itervalues = dict.values
+
+# Store the size of the buffer (1 MB) used when reading and writing csv
+# files, so that large files are read and written in a few big chunks
+# rather than many small ones
+csvBufferSize = 1 << 20
+
+# Python 2's csv module expects files to be opened in binary mode, while
+# Python 3's expects text mode with newline translation turned off.
+# Store the file modes and any extra arguments we'll need to open csv
+# files with.
+if sys.version_info[0] < 3:
+    csvReadMode, csvWriteMode, csvOpenArgs = 'rb', 'wb', {}
+else:
+    csvReadMode, csvWriteMode, csvOpenArgs = 'r', 'w', {'newline': ''}
+
+# Initialize a cache of the csv files csv2dict has already read, so that
+# the same file doesn't need to be read again. Keep up to 64 files in
+# the cache.
+csvCache = boundedCache(64)
 
 ########################################################################
 ############################### dict2csv ###############################
@@ -57,24 +106,56 @@ def dict2csv(dataDict,outPath):
                             csv file
 
     AR Dec 2021
+    AR Oct 2026: Added a faster path for dictionaries that only contain
+                 numbers
     '''
 
-    # Open the csv file where we will be saving our data
-    with open(outPath,'w') as outfile:
+    # Forget anything csv2dict has cached about the file we're about to
+    # overwrite, since its modification time may not change if it's
+    # rewritten quickly
+    forgetCSV(outPath)
+
+    # Get the keys and values of the dictionary together in a single
+    # pass, so that the column names and their data are guaranteed to be
+    # in the same order
+    items = list(dataDict.items())
+    keys = [key for key,_ in items]
+    vals = [val for _,val in items]
+
+    # Check to see if all of the data in the dictionary are plain
+    # integers or floats. If so, none of the values will need quoting
+    # and we can skip the csv writer's checks on every single value.
+    isNumeric = all(type(val) in (int,float) for col in vals for val in col)
+
+    # Open the csv file where we will be saving our data in the mode the
+    # csv module expects. Use a large write buffer so that rows are
+    # written to disk in big blocks. The file will be flushed and closed
+    # once we leave the with block.
+    with open(outPath,csvWriteMode,csvBufferSize,**csvOpenArgs) as outfile:
 
         # Initialize a writer object to write the csv file
         writer = csv.writer(outfile)
 
         # Write all the keys of the dictionary as the column names of
         # the csv file
-        writer.writerow(dataDict.keys())
+        writer.writerow(keys)
 
-        # Write all of the values from each key in the dictionary as the
-        # data in the subsequent rows
-        writer.writerows(izip(*dataDict.values()))
+        # If all of our data are numbers ...
+        if isNumeric:
 
-        # Close the csv file
-        outfile.close()
+            # ... format each row of data with a single format string.
+            # %r writes numbers the same way the csv writer does, and
+            # each row ends with the csv writer's default line
+            # terminator.
+            rowFormat = ','.join(['%r'] * len(keys)) + '\r\n'
+            outfile.writelines(rowFormat % row for row in izip(*vals))
+
+        # Otherwise ...
+        else:
+
+            # ... write all of the values from each key in the
+            # dictionary as the data in the subsequent rows
+            writer.writerows(izip(*vals))
 
 ########################################################################
 ############################### csv2dict ###############################
@@ -93,50 +174,106 @@ def csv2dict(csvPath):
     OUTPUTS a python dictionary
 
     AR April 2022
+    AR Oct 2026: Read the csv file once and transpose its rows into
+                 columns instead of appending each value separately,
+                 remember files that have already been read
     '''
 
-    # Open the csv file
-    with open(csvPath) as csvFile:
+    # Build the key we'll store this file's data under in our cache from
+    # its path, when it was last modified and its size, so that we'll
+    # read the file again if it changes
+    cacheKey = (os.path.abspath(csvPath),os.path.getmtime(csvPath),
+                os.path.getsize(csvPath))
 
-        # Read the csv file row by row
-        csvReader = csv.reader(csvFile)
+    # Check to see if we've already read this version of the file
+    csvDict = csvCache.get(cacheKey)
+
+    # If we haven't read this file yet ...
+    if csvDict is None:
+
+        # ... read it into a python dictionary and store it in our
+        # cache
+        csvDict = readCSV(csvPath)
+        csvCache.put(cacheKey,csvDict)
+
+    # Return a copy of each column's list, so that changes the caller
+    # makes to the dictionary don't change our cached data. All values
+    # read from a csv file are strings, so we don't need to copy the
+    # values themselves.
+    return {col: list(vals) for col, vals in csvDict.items()}
+
+########################################################################
+############################### forgetCSV ##############################
+########################################################################
+
+# Write a function that removes a csv file from csv2dict's cache
+def forgetCSV(csvPath):
+    '''
+    Removes every version of a csv file from csv2dict's cache of files
+    that have already been read
 
-        # Read the first row of the csv file
-        for row in csvReader:
+    forgetCSV(csvPath)
 
-            # Store the list of all the column names in the csv file
-            cols = row
+        - csvPath (String): File path to the location of the csv file
+                            you want csv2dict to read again
+
+    AR Oct 2026
+    '''
+
+    # Get the full path to the csv file, which is how it's stored in our
+    # cache
+    absPath = os.path.abspath(csvPath)
+
+    # Find all the versions of this file we've cached and remove each of
+    # them from our cache
+    for cacheKey in csvCache.keys():
+        if cacheKey[0] == absPath:
+            csvCache.remove(cacheKey)
+
+########################################################################
+############################### readCSV ################################
+########################################################################
 
-            # End the loop as we only want to read the first row
-            break
+# Write a function that does the work of reading a csv file for csv2dict
+def readCSV(csvPath):
+    '''
+    Reads a csv file to a python dictionary without checking csv2dict's
+    cache of files that have already been read
+
+    readCSV(csvPath)
 
-        # Initialize a python dictionary that will contain the contents
-        # of the csv file
-        dict = {}
+        - csvPath (String): File path to the location of the csv file
+                            you want to read into a dictionary
 
-        # Loop across all of the column names in the csv file
-        for key in cols:
+    OUTPUTS a python dictionary
 
-            # Initialize a list under this key
-            dict[key] = []
+    AR Oct 2026
+    '''
 
-    # Re-open the csv file so we can read it with a different package
-    with open(csvPath) as csvFile:
+    # Open the csv file in the mode the csv module expects, so that line
+    # endings are left for the csv reader to handle. Use a large read
+    # buffer to cut down on the number of reads from disk.
+    with open(csvPath,csvReadMode,csvBufferSize,**csvOpenArgs) as csvFile:
 
-        # Use the dict reader to read the csv file row by row
-        reader = csv.DictReader(csvFile)
+        # Read the csv file row by row
+        csvReader = csv.reader(csvFile)
 
-        # Loop across all rows of the csv file
-        for row in reader:
+        # Read the first row of the csv file, which stores the list of
+        # all the column names in the csv file
+        cols = next(csvReader)
 
-            # Loop across all column titles
-            for key in row.keys():
+        # Read all remaining rows of the csv file, skipping any blank
+        # lines
+        rows = [row for row in csvReader if row]
 
-                # Append this value to our dictionary
-                dict[key].append(row[key])
+    # Transpose the rows into columns in a single pass. If any rows are
+    # shorter than the others, the missing values will be filled in
+    # with None.
+    colVals = izip_longest(*rows) if rows else [()] * len(cols)
 
-    # Return the final dictionary
-    return dict
+    # Store the values of each column under its column name in a python
+    # dictionary and return this dictionary
+    return dict(izip(cols,map(list,colVals)))
 
 ########################################################################
 ########################## getNElementsInDict ##########################
@@ -163,11 +300,11 @@ def getNElementsInDict(dic):
     '''
 
     # Check to see if the dictionary is empty (would have no keys)
-    if len(dic.keys()) > 0:
+    if dic:
 
-        # Return the length of the list stored under the first key in
-        # the dictionary
-        return len(dic[dic.keys()[0]])
+        # Return the length of the first list stored in the dictionary,
+        # without building a list of all of the dictionary's keys
+        return len(next(iter(itervalues(dic))))
 
     # If the dictionary did not have any keys ...
     else:
@@ -197,28 +334,25 @@ def mergeDataDicts(dicts):
     AR April 2022
     '''
 
-    # Get a list of all the unique keys across the dictionaries
-    allKeys = []
-    [allKeys.extend(dict.keys()) for dict in dicts]
-    keys = list(set(allKeys))
+    # Get the set of all the unique keys across the dictionaries
+    keys = set().union(*dicts)
 
     # Initialize a python dictionary that will contain the merged data
-    mergedDict = {}
-    for key in keys:
-        mergedDict[key] = []
+    mergedDict = {key: [] for key in keys}
 
     # Loop across all dictionaries that we want to merge
     for dic in dicts:
 
-        # Get the number of elements in each list stored under the keys
-        # of this dictionary
-        nElem = getNElementsInDict(dic)
+        # Build a single list of nans as long as the lists stored under
+        # the keys of this dictionary. We'll use it to fill in the blank
+        # data under every key this dictionary is missing.
+        nanPadding = [float('nan')] * getNElementsInDict(dic)
 
         # Loop across all keys
         for key in keys:
 
             # Check to see if the key is in the dictionary
-            if dic.has_key(key):
+            if key in dic:
 
                 # If the key is in our dictionary, just add the list
                 # under this key to our merged dictionary
@@ -228,7 +362,7 @@ def mergeDataDicts(dicts):
             else:
 
                 # ... then we need to fill in the blank data with nans
-                mergedDict[key].extend([float('nan')]*nElem)
+                mergedDict[key].extend(nanPadding)
 
     # Return the final merged dictionary
     return mergedDict
@@ -262,7 +396,7 @@ def sortDictByKey(dict,key):
     sortedDict = {}
 
     # Store all of the originally ordered values for our key of interest
-    origOrderedVals = map(float,dict[key])
+    origOrderedVals = [float(val) for val in dict[key]]
 
     # Loop across all keys of our original python dictionary
     for k in dict.keys():
@@ -3,9 +3,12 @@ ImageDisplay Module
 
 This module contains functions changing how images are displayed in Fiji
 
-    overlayImages(imgs2merge)
+    overlayImages(imgs2merge,copy=True)
 
-        - Merges images so that they overlap with different colors
+        - Merges images so that they overlap with different colors.
+          copy chooses whether copies of the images are merged, or the
+          images themselves are used up by the merge (True or False for
+          all images, or a list with one choice per image)
 
     getOpenImages()
 
@@ -21,14 +24,16 @@ This module contains functions changing how images are displayed in Fiji
 ############################ IMPORT PACKAGES ###########################
 ########################################################################
 
-# Add Fjij's duplicator package so we can duplicate images
-from ij.plugin import Duplicator
+# Add Fjij's duplicator package so we can duplicate images, and the RGB
+# stack merger so we can merge images into separate color channels
+from ij.plugin import Duplicator, RGBStackMerge
 
-# Initialize a duplicator object
-duplicator = Duplicator()
+# Import IJ so we can run Fiji macros commands, and ImagePlus so we can
+# make arrays of images
+from ij import IJ, ImagePlus
 
-# Import IJ so we can run Fiji macros commands
-from ij import IJ
+# Import jarray so we can make java arrays
+import jarray
 
 # Import izip so we can iterate across multiple lists
 from itertools import izip
@@ -36,39 +41,53 @@ from itertools import izip
 # Import window manager so we can find images currently open in Fiji
 from ij import WindowManager
 
+# Import ImageFiles so we can open image files as virtual stacks
+from ImageTools import ImageFiles
+
+# Import parallelMap so we can duplicate images in parallel
+from ParallelTools import parallelMap
+
 ########################################################################
 ############################# overlayImages ############################
 ########################################################################
 
 # Define a function to overlay images as separate color channels
-def overlayImages(imgs2merge):
+def overlayImages(imgs2merge,copy=True):
     '''
     Merges images so that they overlap with different colors
 
-    overlayImages(imgs2merge)
+    overlayImages(imgs2merge,copy=True)
 
         - imgs2merge (List of Fiji ImagePlus): Images you want to merge
                                                into separate color
                                                channels
 
+        - copy (Boolean or List of Booleans): Do you want to merge
+                                              copies of the images? If
+                                              False, the images in
+                                              imgs2merge will be used up
+                                              (and closed) by the merge,
+                                              which saves duplicating
+                                              all of their pixels. Give
+                                              a list to choose for each
+                                              image separately. Images
+                                              past the end of the list
+                                              are copied. (default =
+                                              True, merge copies of the
+                                              images)
+
     OUTPUT Fiji ImagePlus object containing the merged image. The order
     of the images in imgs2merge determines their final color according
     to this order: green, magenta, blue, gray, yellow, cyan, red
 
     AR Nov 2021
+    AR Oct 2026: Merge the images without displaying them, added option
+                 to skip copying the images, duplicate the images in
+                 parallel, allow choosing which images to copy
     '''
 
-    # Copy each image
-    imgs2merge_cp = [duplicator.run(img) for img in imgs2merge]
-
-    # Display each image
-    [img.show() for img in imgs2merge_cp]
-
-    # Store a list of all of the image names
-    imgNames = [img.getTitle() for img in imgs2merge_cp]
-
     # Check to see if only two images are being overlaid
-    if len(imgNames) < 3:
+    if len(imgs2merge) < 3:
 
         # Indicate that we want the first image to be green and the
         # second magenta
@@ -82,21 +101,57 @@ def overlayImages(imgs2merge):
         # green, blue, red)
         channels = [5,6,7,4,2,3,1]
 
-    # Merge the images, assigning each image a color based on our
-    # ordering
-    IJ.run('Merge Channels...',
-           ' '.join('c%s=%s' % channel for channel in izip(channels[:len(imgNames)],imgNames)) + ' create')
+    # The channel merger colors each image based on its position in the
+    # list of images it is given (red, green, blue, gray, cyan, magenta,
+    # yellow). Initialize this list, leaving the unused positions empty.
+    channelImgs = jarray.array([None] * 7,ImagePlus)
+
+    # Store only the images that will be given a channel
+    imgs2merge = imgs2merge[:len(channels)]
+
+    # If a single choice was given for whether to copy the images, apply
+    # it to all of the images
+    if isinstance(copy,bool):
+        copy = [copy] * len(imgs2merge)
+
+    # If a list of choices was given, copy any images it doesn't cover,
+    # so that we never use up an image the caller didn't say we could
+    elif isinstance(copy,(list,tuple)):
+        copy = list(copy[:len(imgs2merge)]) + [True] * (len(imgs2merge) - len(copy))
+
+    # Otherwise, we don't know which images we're allowed to use up
+    else:
+        raise TypeError('copy must be a boolean or a list of booleans')
+
+    # Store the positions of the images the caller needs kept intact
+    imgs2copy = [i for i, copyImg in enumerate(copy) if copyImg]
+
+    # Check to see if any images need to be copied
+    if imgs2copy:
+
+        # Duplicate the images at the same time, each on its own
+        # thread. Each copy uses its own duplicator, since they may be
+        # made on several threads at once.
+        copies = parallelMap(lambda i: Duplicator().run(imgs2merge[i]),imgs2copy)
 
-    # The overlay will be the currently open ImageJ image. Store this
-    # image as a variable.
-    overlay =  IJ.getImage()
+        # Swap the copies in for the original images. The images we
+        # were allowed to use up are merged directly, with their pixels
+        # shared rather than copied.
+        imgs2merge = list(imgs2merge)
+        for i, imgCopy in izip(imgs2copy,copies):
+            imgs2merge[i] = imgCopy
 
-    # Hide the overlay in case the user doesn't want to see it right
-    # away
-    overlay.hide()
+    # Loop across all images we want to merge and their channel numbers
+    for channel, img in izip(channels,imgs2merge):
 
-    # Close out the duplicated images
-    [img.close() for img in imgs2merge_cp]
+        # Place the image at the position matching its channel number
+        channelImgs[channel - 1] = img
+
+    # Merge the images into a composite image directly, rather than
+    # displaying each image so the Merge Channels macro command can find
+    # it. We don't need to keep the images, so let the merger reuse and
+    # close them.
+    overlay = RGBStackMerge.mergeChannels(channelImgs,False)
 
     # Return the overlaid image
     return overlay
@@ -119,14 +174,18 @@ def getOpenImages():
     AR Dec 2021
     '''
 
+    # Get the IDs of all images currently open. We only ask the window
+    # manager for this list once.
+    ids = WindowManager.getIDList()
+
     # Check to see if any images are open
-    if WindowManager.getIDList() is None:
+    if ids is None:
 
         # Return none if there are no images currently open
         return None
 
     # Get all images currently open
-    open_images = [WindowManager.getImage(id) for id in WindowManager.getIDList()]
+    open_images = [WindowManager.getImage(id) for id in ids]
 
     # If there is only one open image
     if len(open_images) == 1:
@@ -154,26 +213,16 @@ def openAsVirtualStack(imageFile):
         - imageFile (String): File path to the location of the image you
                               want to open
 
-    OUTPUT Opened image as an ImagePlus object
+    OUTPUT Opened image as an ImagePlus object. The image is not
+           displayed.
 
     AR May 2022
+    AR Oct 2026: Open the image the same way as
+                 ImageFiles.openVirtualStack, calling Bio-Formats
+                 directly instead of through a macro
     '''
 
-    # Read the image file into a virtual stack
-    IJ.run("Bio-Formats",
-          "open=[{}] color_mode=Default rois_import=[ROI manager] view=Hyperstack stack_order=XYCZT use_virtual_stack".format(imageFile))
-
-    # Grab the newly opened image
-    img = getOpenImages()
-
-    # Check to see if multiple images were opened
-    if isinstance(img,list):
-
-        # Return just the most recently opened image
-        return img[-1]
-
-    # Otherwise ...
-    else:
-
-        # ... return the only open image
-        return img
+    # Read the image file into a virtual stack with the same Bio-Formats
+    # options ImageFiles uses, so both ways of opening an image behave
+    # the same
+    return ImageFiles.openVirtualStack(imageFile)
@@ -3,12 +3,38 @@ ImageFiles Module
 
 This module contains tools to work easily with image files.
 
-    findImgsInDir(dirPath,fileType=None,searchPhrase=None)
+    compileRegex(pattern)
+
+        - Compiles a regular expression, reusing the compiled regular
+          expression if this pattern has been compiled before
+
+    dirPrefix(dirPath)
+
+        - Returns the path to a directory ending in a path separator
+
+    iterDir(dirPath)
+
+        - Lists the names of the contents of a directory one at a time
+
+    searchDir(dirPath,fileType,regexp,subDirRegexp,streaming=False)
+
+        - Searches a single directory for files, returning the matching
+          files and the sub directories to search next
+
+    findImgsInDir(dirPath,fileType=None,searchPhrase=None,
+                  searchSubDirs=False,subDirPhrase=None,
+                  unwrapSingle=True,streaming=False,limit=None)
 
         - Looks inside a directory for files (like images) of a specific
           file type and contain an optional key phrase in the file name.
 
-    findSubDirs(searchPath)
+    findImgsInDirs(dirPaths,fileType=None,searchPhrase=None,
+                   searchSubDirs=False,unwrapSingle=True)
+
+        - Looks inside many directories at once for files, returning
+          what findImgsInDir finds in each one
+
+    findSubDirs(searchPath,unwrapSingle=False)
 
         - Returns all sub directories directly under the folder
           indicated by the user
@@ -25,6 +51,10 @@ This module contains tools to work easily with image files.
 
         - Returns the number of this field of view
 
+    getFieldNumbers(fieldNames)
+
+        - Returns the numbers of a list of fields of view
+
     getMetadata(imp)
 
         - Reads the metadata for an image file
@@ -51,42 +81,248 @@ import glob
 # something is a file or directory
 import os
 
+# Import stat so we can tell files, directories and soft links apart
+import stat
+
+# Import sys so we can find out how file names are encoded
+import sys
+
 # Import regular expressions so we can search strings for specific
 # information
 import re
 
-# Import bio-formats image reader and MetadataTools so we can work with
-# image metadata
-from loci.formats import CoreMetadata, MetadataTools
+# Import boundedCache so we can remember the regular expressions we've
+# compiled
+from CacheTools import boundedCache
+
+# Store the text that comes right before the field of view number in a
+# file name
+fieldNumberPrefix = 'Field-'
+
+# Import parallelMap so we can search directories in parallel
+from ParallelTools import parallelMap
+
+# Import java's file tools so we can stream through the contents of
+# directories
+from java.nio.file import Files, Paths
+from java.io import IOException
+
+# Store how many directories we'll list at the same time when searching
+# sub folders
+nDirSearchThreads = 8
+
+# Initialize a cache of the regular expressions compileRegex has
+# already compiled, keeping up to 128 of them. The cache can be shared
+# between threads, since findImgsInDirs searches many directories on
+# separate threads.
+regexCache = boundedCache(128)
+
+########################################################################
+############################# compileRegex #############################
+########################################################################
+
+# Define a function that compiles regular expressions, remembering the
+# ones it has already compiled
+def compileRegex(pattern):
+    '''
+    Compiles a regular expression, reusing the compiled regular
+    expression if this pattern has been compiled before
+
+    compileRegex(pattern)
 
-# Import Hashtable from java so we can create metadata maps
-from java.util import Hashtable
+        - pattern (String): Regular expression you want to compile
 
-# Import IJ so we can figure out the ImageJ version
-from ij import IJ
+    OUTPUT compiled regular expression object
 
-# Import length from bio formats
-from ome.units.quantity import Length
+    AR Oct 2026
+    '''
 
-# Import bio formats' units class
-from ome.units import UNITS
+    # Check to see if we've already compiled this pattern
+    regexp = regexCache.get(pattern)
 
-# Import bio formats' positive float class
-from ome.xml.model.primitives import PositiveFloat
+    # If we haven't compiled this pattern yet ...
+    if regexp is None:
 
-# Import bio-format's Tiff writer
-from loci.formats.out import TiffWriter
+        # ... compile it and store it in our cache
+        regexp = re.compile(pattern)
+        regexCache.put(pattern,regexp)
 
-# Import some image tools from bio-formats so we can convert ImagePlus
-# images into something readable by bio-formats
-from loci.formats.gui import AWTImageTools as tools
+    # Return the compiled regular expression
+    return regexp
+
+########################################################################
+############################### dirPrefix ##############################
+########################################################################
+
+# Define a function that gets the prefix of the paths to a directory's
+# contents
+def dirPrefix(dirPath):
+    '''
+    Returns the path to a directory ending in a path separator, so that
+    the path to anything inside it can be made by adding on its name
+
+    dirPrefix(dirPath)
+
+        - dirPath (String): Path to the directory
+
+    OUTPUT String that dirPath + name gives the same path as
+    os.path.join(dirPath,name) for any name in the directory
+
+    AR Oct 2026
+    '''
+
+    # Only add a separator if the path doesn't already end in one. An
+    # empty path means the current directory, so leave it empty.
+    if not dirPath or dirPath.endswith(os.sep):
+        return dirPath
+    return dirPath + os.sep
+
+########################################################################
+################################ iterDir ###############################
+########################################################################
+
+# Define a function that streams through the contents of a directory
+def iterDir(dirPath):
+    '''
+    Lists the names of the contents of a directory one at a time, rather
+    than reading them all into a list first like os.listdir
+
+    iterDir(dirPath)
+
+        - dirPath (String): Path to the directory you want to list
+
+    OUTPUT iterator over the names of everything in the directory, in
+    the same order as os.listdir. Raises OSError if the directory can't
+    be read.
+
+    AR Oct 2026
+    '''
+
+    # Open a stream of the directory's contents. java reads the
+    # directory in blocks as we go, rather than building an array of
+    # every name up front. Raise the same error os.listdir would if the
+    # directory can't be read.
+    try:
+        stream = Files.newDirectoryStream(Paths.get(dirPath))
+    except IOException as err:
+        raise OSError(str(err))
+
+    # Store how file names are encoded, so we can hand back names as
+    # strings like os.listdir does
+    encoding = sys.getfilesystemencoding() or 'utf-8'
+
+    # Define a generator that hands back each name in the directory,
+    # closing the stream once we reach the end
+    def names():
+        try:
+            for entry in stream:
+                yield entry.getFileName().toString().encode(encoding)
+        finally:
+            stream.close()
+
+    # Return the names in the directory
+    return names()
+
+########################################################################
+############################### searchDir ##############################
+########################################################################
+
+# Define a function that searches a single directory for files, used by
+# findImgsInDir to search sub folders
+def searchDir(dirPath,fileType,regexp,subDirRegexp,streaming=False):
+    '''
+    Searches a single directory for files of an optional file type that
+    contain an optional key phrase in their path. Used by findImgsInDir
+    to search sub folders.
+
+    searchDir(dirPath,fileType,regexp,subDirRegexp,streaming=False)
+
+        - dirPath (String): Path to the directory to search
+
+        - fileType (String): File type for the files we are trying to
+                             locate, or None
+
+        - regexp (Regular Expression): Compiled search phrase the file
+                                       paths must contain, or None
+
+        - subDirRegexp (Regular Expression): Compiled phrase the names
+                                             of sub folders must
+                                             contain to be searched, or
+                                             None
+
+        - streaming (Boolean): Stream through the directory's contents
+                               with iterDir instead of listing them all
+                               at once (default = False)
+
+    OUTPUT list of the paths to the matching files in the directory, and
+    list of the paths to the sub directories that should be searched
+    next
+
+    AR Oct 2026
+    '''
+
+    # Initialize lists of the matching files in this directory and of
+    # its sub directories
+    files = []
+    subDirs = []
+
+    # Store the directory's path ending in a separator, so the path to
+    # each item is just this prefix followed by its name
+    prefix = dirPrefix(dirPath)
+
+    # List out the contents of this directory, or stream through them if
+    # asked to. Like os.walk, skip any directories that can't be read.
+    try:
+        contents = iterDir(dirPath) if streaming else os.listdir(dirPath)
+    except OSError:
+        return files, subDirs
+
+    # Loop across all contents of the directory
+    for file_name in contents:
+
+        # Concatenate the directory's path with each file name
+        full_path = prefix + file_name
+
+        # Look up what kind of item this is, without following soft
+        # links. Skip anything removed since we listed the directory.
+        try:
+            mode = os.lstat(full_path).st_mode
+        except OSError:
+            continue
+
+        # Check to see if this is a directory
+        if stat.S_ISDIR(mode):
+
+            # If it is, search it as well, as long as its name contains
+            # the phrase sub-folders need
+            if subDirRegexp is None or subDirRegexp.search(file_name) is not None:
+                subDirs.append(full_path)
+
+            # Move on to the next item
+            continue
+
+        # Like os.walk, don't count soft links to directories as files,
+        # but don't search through them either
+        if stat.S_ISLNK(mode) and os.path.isdir(full_path):
+            continue
+
+        # Check the file type first, since it's the cheaper check, then
+        # check to see if the file's path contains our desired key
+        # phrase
+        if (fileType is None or file_name.endswith(fileType)) and (regexp is None or regexp.search(full_path) is not None):
+
+            # If this file passes these checks, we should return it
+            files.append(full_path)
+
+    # Return the matching files and the sub directories to search
+    return files, subDirs
 
 ########################################################################
 ############################ findImgsInDir #############################
 ########################################################################
 
 # Define function to find image files within a directory
-def findImgsInDir(dirPath,fileType=None,searchPhrase=None,searchSubDirs=False):
+def findImgsInDir(dirPath,fileType=None,searchPhrase=None,searchSubDirs=False,subDirPhrase=None,unwrapSingle=True,streaming=False,limit=None):
     '''
     Looks inside a directory for files (like images) of an optional file
     type that contain an optional key phrase in the file name.
@@ -108,85 +344,67 @@ def findImgsInDir(dirPath,fileType=None,searchPhrase=None,searchSubDirs=False):
                                    recursively? (default = False, don't
                                    search subfolders)
 
+        - subDirPhrase (String): Regular expression that must be
+                                 contained within the name of a
+                                 sub-folder for it to be searched, so
+                                 that we don't need to look through
+                                 unrelated sub-folders. Only used if
+                                 searchSubDirs is True, optional
+                                 (default = None, search all
+                                 sub-folders)
+
+        - unwrapSingle (Boolean): If only one file is found, do you want
+                                  just that file's path rather than a
+                                  list? (default = True, return just
+                                  the one path)
+
+        - streaming (Boolean): Do you want to stream through the
+                               contents of each directory rather than
+                               listing them all at once? Useful for
+                               directories with tens of thousands of
+                               files. Wildcards in dirPath aren't
+                               expanded when streaming. (default =
+                               False, list the contents all at once)
+
+        - limit (Integer): Most files you want back. The search stops
+                           as soon as this many files are found, so use
+                           limit=1 if you only need the first matching
+                           file. (default = None, find all matching
+                           files)
+
     OUTPUT
 
         - files (List of Strings): Paths to all files in directory that
                                    match our desired file type and
-                                   search phrase
+                                   search phrase. If only one file
+                                   matches and unwrapSingle is True,
+                                   just that path is returned.
 
     AR Oct 2021
     AR Jan 2022: Changed searchPhrase to a regular expression
     AR Mar 2022: Added option to search sub folders
+    AR Oct 2026: Compile the search phrase once instead of for every
+                 file, check each item in a directory only once,
+                 check files without calling helper functions, added
+                 option to only search matching sub folders, search sub
+                 folders in parallel, added options to always return a
+                 list and to stream through large directories, added
+                 option to stop once enough files are found
     '''
 
     # If dirPath was provided in unicode, convert to String
     if isinstance(dirPath,unicode):
         dirPath = str(dirPath)
 
-    # Define a function to check the file type of a file
-    def is_file_type(file_path):
-        '''
-        Check to see if a given file has the correct file type
-
-        is_file_type(file)
-
-            - file_path (String): Path to file that needs the file type
-                                  checked
-
-        OUTPUT True if file is of specified our desired file type
-
-        AR 10/21
-        '''
-
-        # Check to make sure file types were specified
-        if fileType is None:
-
-            # If no file types were specified, all files are fair game
-            return True
-
-        else:
-
-            # Check to see if the image file name ends with the
-            # specified file type
-            if file_path.endswith(fileType):
-                return True
-            else:
-                return False
-
-    # Define a function to check to see if a file name contains our
-    # desired key phrase
-    def has_search_phrase(file_path):
-        '''
-        Check to see if a file contains our desired search phrase
-
-        has_search_phrase(file_path)
-
-            - file_path (String): Path to file that needs the file type
-                                  checked
-
-        OUTPUT True if file contains our key search phrase
-
-        AR 10/21
-        '''
-
-        # Check to see if we have a desired search phrase
-        if searchPhrase is None:
-
-            # If there is no search phrase to look for, all files are
-            # fine
-            return True
-
-        else:
+    # Make a regular expression out of the search phrase once, rather
+    # than for every file we check. Plugins often search for the same
+    # phrases over and over, so reuse the regular expression if we've
+    # compiled it before.
+    regexp = compileRegex(searchPhrase) if searchPhrase is not None else None
 
-            # Make a regular expression out of the search phrase
-            regexp = re.compile(searchPhrase)
-
-            # Check to see if the search phrase is present in the image
-            # file name
-            if regexp.search(file_path) is None:
-                return False
-            else:
-                return True
+    # Do the same for the phrase sub-folders need to contain to be
+    # searched
+    subDirRegexp = compileRegex(subDirPhrase) if subDirPhrase is not None else None
 
     # Initialize a list storing all of the files in our directory of the
     # correct file type and that contain our desired key phrase
@@ -195,97 +413,226 @@ def findImgsInDir(dirPath,fileType=None,searchPhrase=None,searchSubDirs=False):
     # If we are searching through sub-directories ...
     if searchSubDirs:
 
-        # Us os.walk to loop across all files in the input directory and
-        # its sub directories
-        for subDir, _, files in os.walk(dirPath):
+        # Initialize a dictionary storing the files found in each
+        # directory we've searched and its sub directories
+        results = {}
+
+        # Start by searching the input directory
+        dirs2search = [dirPath]
+
+        # Keep searching until there are no sub directories left
+        while dirs2search:
+
+            # Search all of the directories at this depth, several at a
+            # time. Listing directories mostly means waiting on the file
+            # system (especially network drives), so this hides much of
+            # that waiting.
+            found = parallelMap(lambda path: searchDir(path,fileType,regexp,subDirRegexp,streaming),
+                                dirs2search,nDirSearchThreads)
+
+            # Store what we found in each directory, and get the sub
+            # directories we'll search next
+            results.update(zip(dirs2search,found))
+            dirs2search = [subDir for _, subDirs in found for subDir in subDirs]
+
+            # Unless we're done searching, or might already have found
+            # as many files as the caller wants, move on to the next
+            # depth
+            if dirs2search and limit is None:
+                continue
+
+            # Collect the files found so far in the same order as
+            # os.walk would list the directories, by keeping a stack of
+            # the directories we still need to collect from
+            files2return = []
+            stack = [dirPath]
+            while stack:
+
+                # Stop if we reach a directory we haven't searched yet,
+                # since its files come before any that follow it
+                path = stack.pop()
+                if path not in results:
+                    break
+
+                # Store the files found in this directory
+                files, subDirs = results[path]
+                files2return.extend(files)
+
+                # Stop once we've found as many files as the caller
+                # wants
+                if limit is not None and len(files2return) >= limit:
+                    break
+
+                # Add the sub directories to our stack in reverse order,
+                # so that they're collected in order
+                stack.extend(reversed(subDirs))
+
+            # Stop searching once we've found as many files as the
+            # caller wants, keeping just that many
+            if limit is not None and len(files2return) >= limit:
+                del files2return[limit:]
+                break
 
-            # Loop across all files
-            for file_name in files:
+    else:
 
-                # Concatenate the directory's path with each file name
-                full_path = os.path.join(subDir,file_name)
+        # If we're looking for a specific file type, only ask glob for
+        # items whose names end with it, so that we don't need to look
+        # at any other items. Escape any characters glob would treat as
+        # wildcards.
+        if fileType is not None:
+            pattern = '*' + ''.join('[%s]' % c if c in '*?[' else c for c in fileType)
+        else:
+            pattern = '*'
 
-                # Check the file type
-                if is_file_type(file_name):
+        # Check to see if we should stream through the contents of our
+        # search directory
+        if streaming:
 
-                    # Check to see if the file's path contains our
-                    # desired key phrase
-                    if has_search_phrase(full_path):
+            # If so, get the full path to each item as we go, skipping
+            # hidden files like glob does
+            prefix = dirPrefix(dirPath)
+            names = iterDir(dirPath)
+            paths = (prefix + file_name for file_name in names if not file_name.startswith('.'))
 
-                        # If this file passes these checks, we should
-                        # return it
-                        files2return.append(full_path)
+        # Otherwise ...
+        else:
 
-    else:
+            # ... use glob to list out the contents of our search
+            # directory. glob already gives us the full path to each
+            # item. iglob hands us the items one at a time, so we only
+            # keep the paths of the files we're returning in memory.
+            paths = glob.iglob(os.path.join(dirPath,pattern))
+
+        # Loop across all of the items in our search directory
+        for full_path in paths:
+
+            # Check the file type first, since it's the cheaper check,
+            # then check to see if the file contains our desired key
+            # phrase. We still check the file type ourselves, since glob
+            # ignores upper and lower case on some operating systems.
+            if (fileType is None or full_path.endswith(fileType)) and (regexp is None or regexp.search(full_path) is not None):
+
+                # Look up what kind of item this is with a single call,
+                # without following soft links. Skip anything removed
+                # since we listed the directory.
+                try:
+                    mode = os.lstat(full_path).st_mode
+                except OSError:
+                    continue
+
+                # Check to make sure this content is a file (or a soft
+                # link) rather than a directory
+                if stat.S_ISREG(mode) or stat.S_ISLNK(mode):
+
+                    # If this file passes these checks, we should return
+                    # it
+                    files2return.append(full_path)
+
+                    # Stop looking once we've found as many files as the
+                    # caller wants
+                    if limit is not None and len(files2return) >= limit:
+                        break
+
+        # If we were streaming through the directory, close it now in
+        # case we stopped before reaching the end
+        if streaming:
+            names.close()
+
+    # Check to see if there was only one file to return, and that the
+    # caller wants it on its own
+    if unwrapSingle and len(files2return) == 1:
 
-        # Use os.listdir to list out the contents of our search directory
-        for file_name in glob.glob(os.path.join(dirPath,'*')):
+        # Return just that one file as a string instead of list
+        return files2return[0]
+
+    # Otherwise, if there are multiple files to return, just return full
+    # list
+    return files2return
 
-            # Concatenate the directory's path with each file name
-            full_path = os.path.join(dirPath,file_name)
+########################################################################
+############################ findImgsInDirs ############################
+########################################################################
 
-            # Check to make sure this content is a file rather than a
-            # directory
-            if os.path.isfile(full_path) or os.path.islink(full_path):
+# Define function to find image files within many directories at once
+def findImgsInDirs(dirPaths,fileType=None,searchPhrase=None,searchSubDirs=False,unwrapSingle=True):
+    '''
+    Looks inside many directories at once for files (like images) of an
+    optional file type that contain an optional key phrase in the file
+    name.
 
-                # Check the file type
-                if is_file_type(file_name):
+    findImgsInDirs(dirPaths,fileType=None,searchPhrase=None,
+                   searchSubDirs=False,unwrapSingle=True)
 
-                    # Check to see if the file contains our desired key
-                    # phrase
-                    if has_search_phrase(file_name):
+        - dirPaths (List of Strings): Paths to the directories within
+                                      which you would like to search for
+                                      your files
 
-                        # If this file passes these checks, we should return
-                        # it
-                        files2return.append(full_path)
+        - fileType, searchPhrase, searchSubDirs, unwrapSingle: Same as
+          for findImgsInDir, applied to every directory
 
-    # Check to see if there was only one file to return
-    if len(files2return) == 1:
+    OUTPUT list containing what findImgsInDir finds in each directory,
+    in the same order as dirPaths
 
-        # Return just that one file as a string instead of list
-        return files2return[0]
+    AR Oct 2026
+    '''
 
-    # Otherwise, if there are multiple files to return, just return full
-    # list
-    return files2return
+    # Search several directories at the same time, which hides much of
+    # the time spent waiting on the file system, and return the results
+    # in order. Every directory is searched with the same options.
+    return parallelMap(lambda dirPath: findImgsInDir(dirPath,
+                                                     fileType=fileType,
+                                                     searchPhrase=searchPhrase,
+                                                     searchSubDirs=searchSubDirs,
+                                                     unwrapSingle=unwrapSingle),
+                       dirPaths,nDirSearchThreads)
 
 ########################################################################
 ############################## findSubDirs #############################
 ########################################################################
 
 # Define a function that will return all sub directories under a path
-def findSubDirs(searchPath):
+def findSubDirs(searchPath,unwrapSingle=False):
     '''
     Returns all sub directories directly under the folder indicated by
     the user
 
-    findSubDirs(searchPath)
+    findSubDirs(searchPath,unwrapSingle=False)
 
         - searchPath (String): Path to folder under which you would like
                                to find sub directories
 
+        - unwrapSingle (Boolean): If there is only one sub directory, do
+                                  you want just its name rather than a
+                                  list? (default = False, always return
+                                  a list)
+
     OUTPUT list of strings giving the names of all sub directories under
-           searchPath
+           searchPath. If there is only one sub directory and
+           unwrapSingle is True, just its name is returned. If there
+           are none, the list is empty.
 
     AR Oct 2021
+    AR Oct 2026: Return an empty list rather than failing when there are
+                 no sub directories, always return a list unless asked
+                 to unwrap a single sub directory
     '''
 
     # Use os.listdir to get all contents under searchPath, and check to
-    # see what are subdirectories
+    # see what are subdirectories. Each item only needs to be checked
+    # once.
     subdirs = [dir for dir in os.listdir(searchPath) if os.path.isdir(os.path.join(searchPath,dir))]
 
-    # If there was more than one sub directory...
-    if len(subdirs) > 1:
-
-        # ... return the whole list
-        return subdirs
-
-    # If there was only one sub directory ...
-    else:
+    # If there was only one sub directory, and the caller wants it on
+    # its own ...
+    if unwrapSingle and len(subdirs) == 1:
 
         # ... return that sub directory
         return subdirs[0]
 
+    # Otherwise, return the whole list, which will be empty if there
+    # were no sub directories
+    return subdirs
+
 ########################################################################
 ################################ makedir ###############################
 ########################################################################
@@ -300,19 +647,30 @@ def makedir(dir2make):
         - dir2make (String): Path to the location of the new directory
                              you want to make
 
-    Will first check to see if the directory you are trying to make
-    already exists. It it doesn't already exist, this function will make
-    the folder.
+    If the directory you are trying to make already exists, this
+    function won't do anything. If it doesn't already exist, this
+    function will make the folder.
 
     AR Oct 2021
+    AR Oct 2026: Try to make the folder first rather than checking for
+                 it beforehand
     '''
 
-    # Check to see if the folder already exists
-    if not os.path.exists(dir2make):
-
-        # Make the folder if it doesn't already exist
+    # Try to make the folder. If another script (or thread) makes the
+    # same folder between a check and our attempt to make it, we would
+    # fail, so we just try and then deal with the folder already
+    # existing.
+    try:
         os.makedirs(dir2make)
 
+    # If we couldn't make the folder ...
+    except OSError:
+
+        # ... check to see if it's because the folder already exists. If
+        # not, let the caller know what went wrong.
+        if not os.path.exists(dir2make):
+            raise
+
 ########################################################################
 ############################# makeSoftLink #############################
 ########################################################################
@@ -331,20 +689,22 @@ def makeSoftLink(file2Link,linkPath):
                              soft link
 
     AR Oct 2021
+    AR Oct 2026: No longer changes the current working directory
     '''
 
-    # Store the directory where the link will be saved
+    # Store the full path to where the link will be saved, and the
+    # directory it will be saved in. We don't change the current working
+    # directory, since other code (and other threads) may rely on it.
+    linkPath = os.path.abspath(linkPath)
     linkDir = os.path.dirname(linkPath)
 
-    # Change the current working directory to where we want to make the
-    # soft link
-    os.chdir(linkDir)
-
     # Store the relative path from where the file to be linked is
     # located to where we want to make the soft link
-    linkRelPath = os.path.relpath(file2Link,linkDir)
+    linkRelPath = os.path.relpath(os.path.abspath(file2Link),linkDir)
 
-    # Create the softlink
+    # Create the softlink. A relative soft link is followed from the
+    # directory containing the link, so it doesn't matter what the
+    # current working directory is.
     os.symlink(linkRelPath,linkPath)
 
 ########################################################################
@@ -365,16 +725,65 @@ def getFieldNumber(fieldName):
     AR Dec 2021
     AR Feb 2022: Updated since we're no longer numbering fields by row
                  or column
+    AR Oct 2026: Find the number with string methods instead of a
+                 regular expression
     '''
 
-    # Define a regular expression to identify the row and column numbers
-    regex = re.compile('.*Field-(?P<Field_of_View_Number>\d+)_.*')
+    # Make sure the field of view name is a string
+    fieldName = str(fieldName)
+
+    # Start searching from the end of the field of view name. If there
+    # are several field of view numbers (for instance, in a folder name
+    # as well as the file name), the last one is the number of this
+    # field of view.
+    end = len(fieldName)
+
+    # Keep searching backwards until we find a field of view number
+    while True:
 
-    # Match the string pattern with our field of view name
-    matches = regex.match(str(fieldName))
+        # Find the last place 'Field-' appears before where we stopped
+        # searching
+        start = fieldName.rfind(fieldNumberPrefix,0,end)
 
-    # Return the field of view number as an integer
-    return int(matches.groupdict()['Field_of_View_Number'])
+        # Raise an error if there's no field of view number in the name
+        if start < 0:
+            raise ValueError('No field of view number in ' + fieldName)
+
+        # Store the text between 'Field-' and the next underscore
+        numStart = start + len(fieldNumberPrefix)
+        numEnd = fieldName.find('_',numStart)
+        number = fieldName[numStart:numEnd]
+
+        # If there is an underscore and only digits come before it, we
+        # found the field of view number, so return it as an integer
+        if numEnd > 0 and number.isdigit():
+            return int(number)
+
+        # Otherwise, keep searching before this 'Field-'
+        end = start
+
+########################################################################
+############################ getFieldNumbers ###########################
+########################################################################
+
+# Define a function to get the numbers of many fields of view at once
+def getFieldNumbers(fieldNames):
+    '''
+    Returns the numbers of a list of fields of view
+
+    getFieldNumbers(fieldNames)
+
+        - fieldNames (List of Strings): File names of the fields of view
+
+    OUTPUT list of the numbers of these fields of view as integers, in
+    the same order as fieldNames
+
+    AR Oct 2026
+    '''
+
+    # Find the field of view number in each file name in one pass over
+    # the list
+    return [getFieldNumber(fieldName) for fieldName in fieldNames]
 
 ########################################################################
 ############################## getMetadata #############################
@@ -393,50 +802,93 @@ def getMetadata(imp):
     containing the metadata for this image
 
     AR Jan 2022
+    AR Oct 2026: Look up each image property once, label the pixel type
+                 from the bit depth, import bio-formats only when it's
+                 needed
     '''
 
+    # Import bio-formats' core metadata and MetadataTools so we can work
+    # with image metadata, and FormatTools so we can label the type of
+    # data stored in each pixel
+    from loci.formats import CoreMetadata, FormatTools, MetadataTools
+
+    # Import Hashtable from java so we can create metadata maps
+    from java.util import Hashtable
+
+    # Import IJ so we can figure out the ImageJ version
+    from ij import IJ
+
+    # Import length and units from bio formats so we can store the
+    # image's resolution
+    from ome.units.quantity import Length
+    from ome.units import UNITS
+
     # Initialize an object to store core metadata
     core = CoreMetadata()
 
     # Store the file info from the ImagePlus
     impFileInfo = imp.getFileInfo()
 
+    # Look up each of the image's properties we need once, since several
+    # of them are used more than once and each lookup is a call into
+    # java
+    bytesPerPixel = imp.getBytesPerPixel()
+    bitsPerPixel = bytesPerPixel * 8 # A byte is a group of 8 bits
+    width = imp.getWidth()
+    height = imp.getHeight()
+    nChannels = imp.getNChannels()
+
+    # Store the bio-formats pixel type for each bit depth of image.
+    # ImageJ's 16-bit images are unsigned, so they need to be labelled
+    # as such or values above 32767 will be read back as negative.
+    # 32-bit images hold floats, which saveCompressedImg writes as float
+    # bytes.
+    pixelTypes = {8: FormatTools.UINT8,
+                  16: FormatTools.UINT16,
+                  32: FormatTools.FLOAT}
+
+    # Grab the calibration for this image, along with its resolution and
+    # the units of its resolution
+    impCalibration = imp.getCalibration()
+    xResolution = impCalibration.getX(1)
+    yResolution = impCalibration.getY(1)
+    zResolution = impCalibration.getZ(1)
+    unit = impCalibration.getUnit()
+
     # Use the image plus object to extract the image properties to add
     # to the metadata
-    core.bitsPerPixel = imp.getBytesPerPixel() * 8 # A byte is a group
-                                                   # of 8 bits
+    core.bitsPerPixel = bitsPerPixel
     core.dimensionOrder = 'XYZTC'
     core.imageCount = impFileInfo.nImages
     core.littleEndian = impFileInfo.intelByteOrder
-    core.pixelType = imp.getBytesPerPixel()
+    core.pixelType = pixelTypes.get(imp.getBitDepth(),bytesPerPixel)
     core.rgb = imp.getBitDepth() == 24 # 24 bit depth for ImagePlus is
                                        # for RGB images
-    core.sizeC = imp.getNChannels()
+    core.sizeC = nChannels
     core.sizeT = imp.getNFrames()
-    core.sizeX = imp.getWidth()
-    core.sizeY = imp.getHeight()
+    core.sizeX = width
+    core.sizeY = height
     core.sizeZ = imp.getNSlices()
 
-    # Create a metadata map for this image
-    metaMap = Hashtable()
-
-    # Grab the calibration for this image
-    impCalibration = imp.getCalibration()
-
     # Store the current ImageJ version
     ImageJVersion = IJ.getVersion()
 
-    # Add in metadata for our image into our metadata map
-    metaMap.put('ImageLength',imp.getHeight())
-    metaMap.put('XResolution',impCalibration.getX(1))
-    metaMap.put('ImageJ',ImageJVersion[ImageJVersion.index('/')+1:])
-    metaMap.put('YResolution',impCalibration.getY(1))
-    metaMap.put('ResolutionUnit',impCalibration.getUnit())
-    metaMap.put('Unit',impCalibration.getUnit())
-    metaMap.put('NumberOfChannels',imp.getNChannels())
-    metaMap.put('BitsPerSample',imp.getBytesPerPixel() * 8)
-    metaMap.put('ImageWidth',imp.getWidth())
-    metaMap.put('SamplesPerPixel',impFileInfo.samplesPerPixel)
+    # Collect the metadata for our image
+    entries = {'ImageLength': height,
+               'XResolution': xResolution,
+               'ImageJ': ImageJVersion[ImageJVersion.index('/')+1:],
+               'YResolution': yResolution,
+               'ResolutionUnit': unit,
+               'Unit': unit,
+               'NumberOfChannels': nChannels,
+               'BitsPerSample': bitsPerPixel,
+               'ImageWidth': width,
+               'SamplesPerPixel': impFileInfo.samplesPerPixel}
+
+    # Create a metadata map for this image containing all of our
+    # metadata at once, rather than adding each entry to the (thread
+    # safe, so locked on every change) Hashtable one at a time
+    metaMap = Hashtable(entries)
 
     # Add the metadata map to the core metadata
     core.seriesMetadata = metaMap
@@ -449,9 +901,9 @@ def getMetadata(imp):
 
     # Add the resolution to the image metadata
     # TODO: Don't hard code image resolution
-    meta.setPixelsPhysicalSizeX(Length(impCalibration.getX(1),UNITS.MICROMETER),0)
-    meta.setPixelsPhysicalSizeY(Length(impCalibration.getY(1),UNITS.MICROMETER),0)
-    meta.setPixelsPhysicalSizeZ(Length(impCalibration.getZ(1),UNITS.MICROMETER),0)
+    meta.setPixelsPhysicalSizeX(Length(xResolution,UNITS.MICROMETER),0)
+    meta.setPixelsPhysicalSizeY(Length(yResolution,UNITS.MICROMETER),0)
+    meta.setPixelsPhysicalSizeZ(Length(zResolution,UNITS.MICROMETER),0)
 
 
     # Return the metadata
@@ -476,8 +928,22 @@ def saveCompressedImg(img,metaData,outFile):
         - outFile (String): File path to where you want to save the image
 
     AR Jan 2022
+    AR Oct 2026: Save the pixels of 8, 16 and 32-bit images directly
+                 instead of cropping each plane, write planes
+                 sequentially, import bio-formats only when it's needed
     '''
 
+    # Import bio-format's Tiff writer
+    from loci.formats.out import TiffWriter
+
+    # Import some image tools from bio-formats so we can convert
+    # ImagePlus images into something readable by bio-formats
+    from loci.formats.gui import AWTImageTools as tools
+
+    # Import bio-formats' data tools so we can convert arrays of pixels
+    # into bytes
+    from loci.common import DataTools
+
     # Initialize a bio-formats image writer object
     writer = TiffWriter()
 
@@ -487,26 +953,75 @@ def saveCompressedImg(img,metaData,outFile):
     # Instruct the writer to save the image with compression
     writer.setCompression("zlib")
 
+    # Let the writer know we'll be saving the planes in order, so it can
+    # write them out one after another rather than seeking around the
+    # file
+    writer.setWriteSequentially(True)
+
     # Set the file location to write to
     writer.setId(outFile)
 
+    # Grab the stack of planes in the image once, so we can read each
+    # plane's pixels directly
+    stack = img.getStack()
+
+    # Store the bit depth of the image
+    bitDepth = img.getBitDepth()
+
+    # Check to see whether the metadata asks for the pixels to be saved
+    # little endian. Like the writer, assume big endian if the metadata
+    # doesn't say.
+    bigEndian = metaData.getPixelsBinDataBigEndian(0,0)
+    littleEndian = bigEndian is not None and not bigEndian
+
+    # Look up the java methods we'll call for every plane once, rather
+    # than on every pass through the loop
+    getPixels = stack.getPixels
+    saveBytes = writer.saveBytes
+    shortsToBytes = DataTools.shortsToBytes
+    floatsToBytes = DataTools.floatsToBytes
+
     # loop across all planes of the image
-    for p in range(img.getNSlices()):
+    for p in xrange(img.getNSlices()):
 
-        # Set the current z-slice of the image
-        img.setSliceWithoutUpdate(p+1)
+        # Check to see if this is an 8-bit image
+        if bitDepth == 8:
 
-        # Crop the current z-slice of the image
-        curSlice = img.crop()
+            # If it is, the plane's pixels are already an array of
+            # bytes we can save directly
+            plane = getPixels(p+1)
 
-        # Convert this plane into a java buffered image
-        bufrdimg = curSlice.getBufferedImage()
+        # Check to see if this is a 16-bit image
+        elif bitDepth == 16:
 
-        # Convert the buffered image into a bytes array
-        plane = tools.getBytes(bufrdimg)
+            # If it is, convert the plane's pixels into bytes in the
+            # byte order given by the metadata
+            plane = shortsToBytes(getPixels(p+1),littleEndian)
+
+        # Check to see if this is a 32-bit image
+        elif bitDepth == 32:
+
+            # If it is, convert the plane's pixels into bytes in the
+            # byte order given by the metadata
+            plane = floatsToBytes(getPixels(p+1),littleEndian)
+
+        # Otherwise, for RGB images ...
+        else:
+
+            # ... set the current z-slice of the image
+            img.setSliceWithoutUpdate(p+1)
+
+            # Crop the current z-slice of the image
+            curSlice = img.crop()
+
+            # Convert this plane into a java buffered image
+            bufrdimg = curSlice.getBufferedImage()
+
+            # Convert the buffered image into a bytes array
+            plane = tools.getBytes(bufrdimg)[0]
 
         # Save the bytes from this plane to the file
-        writer.saveBytes(p,plane[0])
+        saveBytes(p,plane)
 
     # Close the writer object
     writer.close()
@@ -527,17 +1042,35 @@ def openVirtualStack(path):
     OUTPUT ImagePlus object containing the virtual stack
 
     AR Feb 2023
+    AR Oct 2026: Call Bio-Formats directly instead of through a macro,
+                 import bio-formats only when it's needed
     '''
 
-    # Open the image using bio-formats
-    IJ.run("Bio-Formats",
-           'open={} color_mode=Default rois_import=[ROI manager] view=Hyperstack stack_order=XYCZT use_virtual_stack'.format(path));
-
-    # Grab the image plus object
-    imp = IJ.getImage()
-
-    # Hide the image plus object
-    imp.hide()
+    # Import Bio-Formats and its importer options so we can open the
+    # image file as a virtual stack. The importer options are in a
+    # package called 'in', which is a python keyword that only Jython
+    # accepts in an import statement, so import that package by name.
+    # This lets the rest of this module be loaded and tested outside of
+    # Fiji.
+    from loci.plugins import BF
+    from importlib import import_module
+    ImporterOptions = import_module('loci.plugins.in').ImporterOptions
+
+    # Set up the Bio-Formats importer options so the image is read into
+    # a virtual hyperstack with XYCZT ordering, with any ROIs sent to the
+    # ROI manager
+    options = ImporterOptions()
+    options.setId(path)
+    options.setVirtual(True)
+    options.setColorMode(ImporterOptions.COLOR_MODE_DEFAULT)
+    options.setROIsMode(ImporterOptions.ROIS_MODE_MANAGER)
+    options.setStackFormat(ImporterOptions.VIEW_HYPERSTACK)
+    options.setStackOrder(ImporterOptions.ORDER_XYCZT)
+
+    # Open the image by calling Bio-Formats directly. This returns the
+    # opened images without displaying them, so we don't need to find
+    # the image among the open windows or hide it afterwards.
+    imps = BF.openImagePlus(options)
 
     # Return the resulting image plus object
-    return imp
+    return imps[-1]
@@ -10,15 +10,28 @@ This module contains tools to process images in Fiji.
           center of the stack, or cropping the stack around the central
           z-slices.
 
+    applyDisplayRange(img,minVal,maxVal)
+
+        - Rescales the pixel values of an image (or every slice of a
+          z-stack) so that a range of values fills its full dynamic range
+
     normalizeImg(img)
 
         - Automatically adjusts the brightness/contrast of an image and
           performs a histogram normalization
 
+    normalizeImgs(imgs)
+
+        - Normalizes several images at once, each on its own thread
+
     smoothImg(img)
 
         - Automatically smooths image using Fiji's Gaussian Blur Plugin
 
+    smoothImgs(imgs)
+
+        - Smooths several images at once, each on its own thread
+
     segmentImg(img)
 
         - Automatically segments an image using Fiji's Statistical
@@ -42,6 +55,11 @@ This module contains tools to process images in Fiji.
 
         - Automatically rotates an image by a set angle
 
+    autoFindRotation(img)
+
+        - Finds the angle that best straightens an image without asking
+          the user, returns the rotated image and the angle of rotation
+
 '''
 
 ########################################################################
@@ -52,9 +70,9 @@ This module contains tools to process images in Fiji.
 # and the Duplicator so we can duplicate ImagePlus objects
 from ij.plugin import ZProjector, Duplicator
 
-# Initialize instance of ZProjector and Duplicator
+# Initialize instance of ZProjector. Each function makes its own
+# Duplicator, since images may be copied on several threads at once.
 zprojector = ZProjector()
-duplicator = Duplicator()
 
 # Import Fiji's contrast enhancement package
 from ij.plugin import ContrastEnhancer
@@ -62,22 +80,41 @@ from ij.plugin import ContrastEnhancer
 # Import IJ so we can run macros commands
 from ij import IJ, ImagePlus
 
-# Import floor from math so we can round down
-from math import floor
+# Import the trigonometry functions so we can work out the size of
+# rotated images, and sqrt so we can compute the golden ratio
+from math import sin, cos, radians, sqrt
+
+# Import ImageStatistics and Measurements so we can measure the pixels
+# of individual slices of a z-stack
+from ij.process import ImageStatistics
+from ij.measure import Measurements
 
-# Import GaussianBlur class so we can smooth images, and Rotator so we
-# can rotate images
-from ij.plugin.filter import GaussianBlur, Rotator
+# Import jarray so we can make java arrays
+import jarray
 
-# Initialize a rotator object
-rotator = Rotator()
+# Import GaussianBlur class so we can smooth images
+from ij.plugin.filter import GaussianBlur
 
-# Import a generic dialog so we can display messages to the user
-from ij.gui import GenericDialog
+# Store the largest size (in pixels) of the image shown when previewing
+# rotations
+maxPreviewSize = 1024
+
+# Store the largest size (in pixels) of the image used to score angles
+# when searching for the best rotation
+maxAngleSearchSize = 256
 
 # Import ROI Tools so we can work with Fiji ROIs
 import ROITools
 
+# Import ImageProcessor and ByteProcessor so we can work with the
+# pixels of images directly. Fiji classes only needed by one function
+# are imported inside that function, so that scripts only load the
+# parts of Fiji they use.
+from ij.process import ImageProcessor, ByteProcessor
+
+# Import parallelMap so we can process images in parallel
+from ParallelTools import parallelMap
+
 ########################################################################
 ################################ zStack ################################
 ########################################################################
@@ -94,6 +131,16 @@ class zStack:
         - orig_z_stack (Fiji ImagePlus): Original z-stack to be
                                          projected
 
+        - centralSlice (Int): Slice number at the center of the z-stack,
+                              or None until it has been computed. It's
+                              only computed once for each zStack
+                              object, so make a new zStack object if
+                              the image's pixels change.
+
+        - zLevels (Dictionary): Starting and ending z-levels already
+                                chosen by setZLevels4Focus, stored by
+                                the number of slices asked for
+
     METHODS
 
         - centerOfStack(): Method that will return the slice identified
@@ -120,6 +167,8 @@ class zStack:
     AR Oct 2021
     AR Nov 2021, added setZLevels4Focus and cropZStack methods
     AR Dec 2021, renamed images after they are cropped
+    AR Oct 2026, remember the center of the stack and the z-levels
+                 chosen so they're only computed once
     '''
 
     # Initialize object
@@ -136,6 +185,13 @@ class zStack:
         # Store the original z-stack that will be projected
         self.orig_z_stack = img
 
+        # Indicate that we haven't found the center of the stack yet
+        self.centralSlice = None
+
+        # Initialize a dictionary storing the z-levels we've chosen for
+        # each number of slices
+        self.zLevels = {}
+
     # Define a method that will be used to identify the central slice of
     # the z-stack
     def centerOfStack(self):
@@ -150,27 +206,74 @@ class zStack:
         AR Oct 2021
         AR Feb 2023 Changed how we identify the stack height to work
                     more generally
+        AR Oct 2026 Measure each slice's pixels directly instead of
+                    changing the current slice of the image, only
+                    compute the center once, find the brightest slice
+                    in a single pass, measure the slices in parallel
+                    unless they're read from disk
         '''
 
+        # Check to see if we've already found the center of the stack
+        if self.centralSlice is not None:
+
+            # If so, just return it rather than measuring every slice
+            # again
+            return self.centralSlice
+
         # Store the total number of z-slices in the image
         nSlices = self.orig_z_stack.getStackSize()
 
-        # Create a list that will store the average gray level at each
-        # slice
-        pxl_avgs = []
+        # Grab the stack of slices once, along with any ROI and the
+        # calibration of the image, so that each slice can be measured
+        # the same way the image itself would be
+        stack = self.orig_z_stack.getStack()
+        roi = self.orig_z_stack.getRoi()
+        calibration = self.orig_z_stack.getCalibration()
+
+        # Define how to measure the average pixel intensity of a slice.
+        # Get the slice's pixels without changing the current slice in
+        # the image, and only measure the pixels inside the image's ROI,
+        # if it has one. We only compute the mean, rather than all of
+        # the statistics of the slice.
+        def measureSlice(s):
+            ip = stack.getProcessor(s)
+            if roi is not None:
+                ip.setRoi(roi)
+            return ImageStatistics.getStatistics(ip,Measurements.MEAN,calibration).mean
+
+        # Check to see if this is a virtual stack
+        if stack.isVirtual():
+
+            # If it is, each slice is read from disk when it's asked
+            # for, and virtual stacks can't be read from several threads
+            # at once. Measure the slices one at a time, so only one
+            # slice is in memory at once.
+            pxl_avgs = (measureSlice(s) for s in xrange(1,nSlices + 1))
+
+        # Otherwise, the slices are already in memory ...
+        else:
+
+            # ... so measure several slices at a time, each task reading
+            # its own slice from the stack
+            pxl_avgs = parallelMap(measureSlice,xrange(1,nSlices + 1))
 
-        # Loop across all slices of the image
-        for s in range(1,nSlices + 1):
+        # Keep track of the brightest slice we've seen so far and its
+        # average gray level, rather than storing the average gray level
+        # of every slice
+        brightestSlice = 1
+        brightestAvg = None
 
-            # Change the current slice in the image
-            self.orig_z_stack.setSliceWithoutUpdate(s)
+        # Loop across the average pixel intensity of each slice in order
+        for s, pxl_avg in enumerate(pxl_avgs,1):
 
-            # Store the average pixel intensity at this slice in our
-            # listpxl_avgs
-            pxl_avgs.append(self.orig_z_stack.getStatistics().mean)
+            # If this slice is brighter than any before it, it's our new
+            # brightest slice. Ties go to the first slice, as before.
+            if brightestAvg is None or pxl_avg > brightestAvg:
+                brightestSlice = s
+                brightestAvg = pxl_avg
 
         # Store this slice number as an attribute for the object
-        self.centralSlice = pxl_avgs.index(max(pxl_avgs)) + 1
+        self.centralSlice = brightestSlice
 
         # Return the slice number with the largest average pixel
         # intensity
@@ -212,6 +315,8 @@ class zStack:
                                        projection
 
         AR Nov 2021
+        AR Oct 2026: Reuse the z-levels already chosen for this number
+                     of slices
         '''
 
         # Check to see if the staring and ending z-levels of the z-stack
@@ -226,28 +331,48 @@ class zStack:
             # Finish this method without returning anything
             return
 
-        # Halve the desired number of slices, rounding down
-        half_nSlices = int(floor(float(slices)/2.0))
+        # Check to see if we've already chosen z-levels for this number
+        # of slices
+        if slices in self.zLevels:
+
+            # Grab the z-levels we chose before
+            zLevels = self.zLevels[slices]
+
+            # If the central slice was too close to the edges, return
+            # None again
+            if zLevels is None:
+                return
+
+            # Otherwise, store the starting and ending slice again, in
+            # case other z-levels were used since, and return them
+            self.starting_z_included, self.ending_z_included = zLevels
+            return list(zLevels)
 
-        # Check to see we've already computed the central slice of
-        # this z-stack
-        if not hasattr(self,'centralSlice'):
+        # Halve the desired number of slices, rounding down. Shifting
+        # the bits of a whole number right by one halves it.
+        half_nSlices = int(slices) >> 1
 
-            # If the central slice attribute hasn't been computed,
-            # compute it now
-            self.centerOfStack()
+        # Get the central slice of this z-stack. This is only computed
+        # the first time it's needed.
+        centralSlice = self.centerOfStack()
 
         # Make sure the central z-plane isn't too close to the edges
         # of the z-stack
-        if self.centralSlice < half_nSlices + 1 or self.centralSlice > self.orig_z_stack.getStackSize() - half_nSlices:
+        if centralSlice < half_nSlices + 1 or centralSlice > self.orig_z_stack.getStackSize() - half_nSlices:
+
+            # Remember that these z-levels can't be used
+            self.zLevels[slices] = None
 
             # If the central slice is too close to the edges, return None
             return
 
         # Store the starting and ending slice that will be included
         # in the maximum intensity projection
-        self.starting_z_included = int(self.centralSlice - half_nSlices)
-        self.ending_z_included = int(self.centralSlice + half_nSlices)
+        self.starting_z_included = int(centralSlice - half_nSlices)
+        self.ending_z_included = int(centralSlice + half_nSlices)
+
+        # Remember these z-levels in case they're asked for again
+        self.zLevels[slices] = (self.starting_z_included,self.ending_z_included)
 
         # Return the starting and ending z-levels
         return [self.starting_z_included,self.ending_z_included]
@@ -357,7 +482,7 @@ class zStack:
 
             # If no number of slices were included, return the full
             # z-stack
-            return duplicator.run(self.orig_z_stack)
+            return Duplicator().run(self.orig_z_stack)
 
         # If the user has at some point specified the number of slices
         # to be included...
@@ -372,9 +497,9 @@ class zStack:
 
             # Get a copy of the z-stack including only our desired
             # z-slices
-            cropped_img = duplicator.run(self.orig_z_stack,
-                                         self.starting_z_included,
-                                         self.ending_z_included)
+            cropped_img = Duplicator().run(self.orig_z_stack,
+                                           self.starting_z_included,
+                                           self.ending_z_included)
 
             # Rename the cropped image so that it's the same as the
             # original z stack
@@ -383,40 +508,116 @@ class zStack:
             # Return this cropped image
             return cropped_img
 
+########################################################################
+########################### applyDisplayRange ##########################
+########################################################################
+
+# Define a function that will stretch a range of pixel values across the
+# full dynamic range of an image
+def applyDisplayRange(img,minVal,maxVal):
+    '''
+    Rescales the pixel values of an image (or every slice of a z-stack)
+    so that a range of values fills its full dynamic range. This does
+    the same thing as Fiji's "Apply LUT" command, without going through
+    the macro interpreter.
+
+    applyDisplayRange(img,minVal,maxVal)
+
+        - img (Fiji ImagePlus): Image you want to rescale. Its pixels
+                                are changed directly.
+
+        - minVal (Float): Pixel value that will become black
+
+        - maxVal (Float): Pixel value that will become saturated
+
+    AR Oct 2026
+    '''
+
+    # Store the bit depth of our image
+    bitDepth = img.getBitDepth()
+
+    # The lookup table can only be built for 8 and 16 bit images. For
+    # any other kind of image, let Fiji apply the display range.
+    if bitDepth not in (8,16):
+        img.setDisplayRange(minVal,maxVal)
+        IJ.run(img,'Apply LUT','stack' if img.getImageStackSize() > 1 else '')
+        return
+
+    # Store the number of possible pixel values, and the range of values
+    # the rescaled pixels should fill. Like Fiji, 16 bit images fill the
+    # default 16 bit range if one has been set.
+    tableSize = 256 if bitDepth == 8 else 65536
+    outRange = tableSize
+    if bitDepth == 16 and ImagePlus.getDefault16bitRange() > 0:
+        outRange = 2 ** ImagePlus.getDefault16bitRange() - 1
+
+    # Fiji rounds the display range down to whole pixel values
+    minVal = int(minVal)
+    maxVal = int(maxVal)
+
+    # Build a lookup table giving the rescaled value of every possible
+    # pixel value once, so each pixel only needs to be looked up
+    table = jarray.array([0 if i <= minVal else outRange - 1 if i >= maxVal else int(float(i - minVal) / (maxVal - minVal) * outRange) for i in xrange(tableSize)],'i')
+
+    # Grab the stack of slices in our image
+    stack = img.getStack()
+
+    # Loop across all slices of the image
+    for s in xrange(1,stack.getSize() + 1):
+
+        # Rescale this slice's pixels in place using our lookup table
+        ip = stack.getProcessor(s)
+        ip.resetRoi()
+        ip.applyTable(table)
+
+    # Reset the display range now that the pixels themselves have been
+    # rescaled
+    img.resetDisplayRange()
+
 ########################################################################
 ############################ normalizeImg ##############################
 ########################################################################
 
 # Define a function to normalize images
-def normalizeImg(img):
+def normalizeImg(img,inPlace=False):
     '''
     Automatically adjusts the brightness/contrast of an image and
     performs a histogram normalization.
 
-    normalizeImg(img)
+    normalizeImg(img,inPlace=False)
 
         - img (Fiji ImagePlus): Image you would like to normalize
 
+        - inPlace (Boolean): Do you want to normalize img itself rather
+                             than a copy of it? Saves duplicating all of
+                             the image's pixels if you don't need the
+                             original image afterwards. Virtual stacks
+                             are always copied, since their pixels
+                             can't be changed. (default = False,
+                             normalize a copy of the image)
+
     OUTPUTS normalized image as a Fiji ImagePlus object
 
     AR Oct 2021
+    AR Oct 2026: Rescale the pixels directly instead of running the
+                 "Apply LUT" macro command, project the original image
+                 rather than a copy, added option to normalize the
+                 image in place, use a separate duplicator for each
+                 call so images can be normalized on several threads
     '''
 
+    # Check to see if we can change the image's pixels directly, or if
+    # we need to work on a copy
+    inPlace = inPlace and not img.getStack().isVirtual()
+
     # Check to see if we are working with an image stack or a single
     # image plane
     if img.getImageStackSize() > 1:
 
-        # Duplicate the input z-stack
-        z_stack = duplicator.run(img)
-
-        # Compute the maximum intensity projection of our image using
-        # the zStack object
-        imgStack = zStack(z_stack)
-        maxProjection = imgStack.maxProj()
-
-        # Clear the image stack from memory
-        imgStack.orig_z_stack.close()
-        del imgStack
+        # Compute the maximum intensity projection of the input z-stack
+        # directly. Projecting doesn't change the z-stack, so there's no
+        # need to copy it first.
+        maxProjection = zprojector.run(img,'max')
 
         # Enhance the contrast of the maximum intensity projection. The
         # .35 is Fiji's default value for the parameter called
@@ -433,10 +634,14 @@ def normalizeImg(img):
         maxProjection.close()
         del maxProjection
 
+        # Duplicate the input z-stack, unless we're allowed to change it
+        # directly
+        z_stack = img if inPlace else Duplicator().run(img)
+
         # Use the contrast range from the maximum intensity projection
-        # to adjust the dynamic range of the full z-stack
-        z_stack.setDisplayRange(min4contrast,max4contrast)
-        IJ.run(z_stack,'Apply LUT', 'stack')
+        # to adjust the dynamic range of the full z-stack, rescaling
+        # every slice with the same lookup table
+        applyDisplayRange(z_stack,min4contrast,max4contrast)
 
         # Reset the name of z_stack to match the original image
         z_stack.setTitle(img.getTitle())
@@ -447,8 +652,9 @@ def normalizeImg(img):
     # If the original image is not a z-stack
     else:
 
-        # Duplicate the image
-        imgCp = duplicator.run(img)
+        # Duplicate the image, unless we're allowed to change it
+        # directly
+        imgCp = img if inPlace else Duplicator().run(img)
 
         # Adjust the contrast of the image
         ContrastEnhancer().stretchHistogram(imgCp,.35)
@@ -458,10 +664,9 @@ def normalizeImg(img):
         min4contrast = imgCp.getDisplayRangeMin()
         max4contrast = imgCp.getDisplayRangeMax()
 
-        # Use the contrast range from the maximum intensity projection
-        # to adjust the dynamic range of the full z-stack
-        imgCp.setDisplayRange(min4contrast,max4contrast)
-        IJ.run(imgCp,'Apply LUT', '')
+        # Use the contrast range we found to adjust the dynamic range of
+        # the image
+        applyDisplayRange(imgCp,min4contrast,max4contrast)
 
         # Reset the name of imgCp to match the original image
         imgCp.setTitle(img.getTitle())
@@ -469,6 +674,42 @@ def normalizeImg(img):
         # Return the normalized z-stack
         return imgCp
 
+########################################################################
+############################# normalizeImgs ############################
+########################################################################
+
+# Define a function to normalize several images at once
+def normalizeImgs(imgs,inPlace=False,nThreads=None):
+    '''
+    Normalizes several images at once, for instance each channel of a
+    field of view. Each image gets its own brightness/contrast
+    adjustment, exactly as normalizeImg would give it, but the images
+    are normalized on separate threads.
+
+    normalizeImgs(imgs,inPlace=False,nThreads=None)
+
+        - imgs (List of Fiji ImagePlus): Images you would like to
+                                         normalize
+
+        - inPlace (Boolean): Do you want to normalize the images
+                             themselves rather than copies of them?
+                             (default = False, normalize copies of the
+                             images)
+
+        - nThreads (Int): Number of images to normalize at the same time
+                          (default = None, as many as there are
+                          processors available)
+
+    OUTPUTS list of normalized images as Fiji ImagePlus objects, in the
+    same order as imgs
+
+    AR Oct 2026
+    '''
+
+    # Normalize each image on its own thread, returning the normalized
+    # images in order
+    return parallelMap(lambda img: normalizeImg(img,inPlace),imgs,nThreads)
+
 ########################################################################
 ############################### smoothImg ##############################
 ########################################################################
@@ -488,11 +729,14 @@ def smoothImg(img,radius=6):
     OUTPUTS blurred image as a Fiji ImagePlus object
 
     AR Nov 2021
+    AR Oct 2026: Use a separate duplicator for each call, so images can
+                 be smoothed on several threads at once
     '''
 
     # Duplicate the image so that we don't edit it directly. This image
-    # will later be smoothed using a Gaussian blur
-    gausBlur = duplicator.run(img)
+    # will later be smoothed using a Gaussian blur. A new duplicator is
+    # used since smoothImgs may call this from several threads.
+    gausBlur = Duplicator().run(img)
 
     # Rename this image so that the user knows it is a blurred image
     gausBlur.setTitle('Gaussian_Blur_{}'.format(img.getTitle()))
@@ -503,6 +747,40 @@ def smoothImg(img,radius=6):
     # Return the smoothed image
     return gausBlur
 
+########################################################################
+############################## smoothImgs ##############################
+########################################################################
+
+# Define a function to smooth several images at once
+def smoothImgs(imgs,radius=6,nThreads=None):
+    '''
+    Smooths several images at once, for instance each channel of a
+    field of view, using Fiji's Gaussian Blur Plugin on its own thread
+    for each image.
+
+    smoothImgs(imgs,radius,nThreads)
+
+        - imgs (List of Fiji ImagePlus): Single z-plane images you want
+                                         to smooth
+
+        - radius (Int or Float): Radius of the Gaussian filter you want
+                                 to use for smoothing (default = 6)
+
+        - nThreads (Int): Number of images to smooth at the same time
+                          (default = None, as many as there are
+                          processors available)
+
+    OUTPUTS list of blurred images as Fiji ImagePlus objects, in the
+    same order as imgs
+
+    AR Oct 2026
+    '''
+
+    # Smooth each image on its own thread, returning the smoothed
+    # images in order. Each image is smoothed independently, so they
+    # don't need to wait on each other.
+    return parallelMap(lambda img: smoothImg(img,radius),imgs,nThreads)
+
 ########################################################################
 ############################## segmentImg ##############################
 ########################################################################
@@ -534,8 +812,18 @@ def segmentImg(img,gausRadius=6,q=17,autoThreshMethod='Mean dark'):
     OUTPUTS segmented image as a Fiji ImagePlus object
 
     AR Nov 2021
+    AR Oct 2026: Run the binary clean up directly on the segmentation's
+                 pixels, fixed converting to 16 bit, threshold and
+                 clean up the image without macro commands
     '''
 
+    # Import ImageConverter so we can change the bit depth of images,
+    # the binary and distance map filters so we can clean up the
+    # segmentation, and Prefs so we can set how binary images are stored
+    from ij.process import ImageConverter
+    from ij.plugin.filter import Binary, EDM
+    from ij import Prefs
+
     # Get a smoothed version of that image
     smoothedImg = smoothImg(img,gausRadius)
 
@@ -551,28 +839,47 @@ def segmentImg(img,gausRadius=6,q=17,autoThreshMethod='Mean dark'):
     # binarize this region merging segmentation. However, Fiji's
     # automated thresholding algorithm only support 8 or 16 bit images.
     # Check to see the bit depth of our current image
-    if regMergImg.getBitDepth() in (8,16):
+    if regMergImg.getBitDepth() not in (8,16):
 
-        # If the image is not 8 or 16 bit, convert to 16 bit
-        IJ.run('16-bit')
+        # If the image is not 8 or 16 bit, convert to 16 bit. Convert
+        # this image directly, rather than whichever image is in front.
+        ImageConverter(regMergImg).convertToGray16()
 
     # Make sure Fiji knows that we want the background of our final
     # segmentation to be black
-    IJ.run("Options...", "iterations=1 count=1 black do=Nothing")
+    Prefs.blackBackground = True
 
     # Use Fiji's automated thresholding algorithm to binarize this
-    # segmentation
-    IJ.setAutoThreshold(regMergImg,autoThreshMethod)
-
-    # Convert this threshold into a mask
-    IJ.run('Convert to Mask')
-
-    # Finally, clean up the segmentation using quick binary commands
-    IJ.run("Dilate")
-    IJ.run("Close-")
-    IJ.run("Fill Holes")
-    IJ.run("Erode")
-    IJ.run("Watershed")
+    # segmentation, working on the image's pixels directly
+    ip = regMergImg.getProcessor()
+    ip.setAutoThreshold(autoThreshMethod)
+
+    # Convert this threshold into a mask, with objects white (255) on a
+    # black (0) background, and swap it in for the image's pixels
+    mask = ip.createMask()
+    regMergImg.setProcessor(mask)
+
+    # Finally, clean up the segmentation using quick binary operations.
+    # Dilating followed by closing (a dilation then an erosion) is two
+    # dilations and an erosion, which we run directly on the mask's
+    # pixels rather than through three separate macro commands. Like
+    # the options set above, use a single iteration with a count of 1.
+    mask.dilate(1,0)
+    mask.dilate(1,0)
+    mask.erode(1,0)
+
+    # Fill any holes in the segmented objects, then erode them back.
+    # Run the binary filter directly on the mask rather than through
+    # its macro command.
+    fillHoles = Binary()
+    fillHoles.setup('fill',regMergImg)
+    fillHoles.run(mask)
+    mask.erode(1,0)
+
+    # Separate touching objects, again running the filter directly
+    watershed = EDM()
+    watershed.setup('watershed',regMergImg)
+    watershed.run(mask)
 
     # Hide this new image from view so we're not overwhelmed with popups
     regMergImg.hide()
@@ -600,45 +907,82 @@ def segmentation2ROIs(seg):
                                 to ROIs
 
     OUTPUT List of Fiji ROI objects with separate ROIs for each
-           segmented object
+           segmented object. If there's only one object, just its ROI is
+           returned, or None if there are no objects.
 
     AR Nov 2021
+    AR Oct 2026: Run the particle analyzer directly with a hidden ROI
+                 Manager instead of displaying the segmentation, work
+                 on the segmentation's pixels rather than a copy
     '''
 
-    # Make a copy of this segmented image
-    seg_cp = duplicator.run(seg)
+    # Import the particle analyzer, a hidden ROI Manager and a results
+    # table so we can split segmentations into separate ROIs without any
+    # windows
+    from ij.plugin.filter import ParticleAnalyzer
+    from ij.plugin.frame import RoiManager
+    from ij.measure import ResultsTable
+    from java.lang import Double
+
+    # Grab the pixels of the segmentation, along with any threshold
+    # already set on them so we can put it back afterwards
+    ip = seg.getProcessor()
+    oldMinThreshold = ip.getMinThreshold()
+    oldMaxThreshold = ip.getMaxThreshold()
+
+    # Wrap the segmentation's pixels in a new image. The pixels aren't
+    # copied, since we only read them, but this image doesn't share any
+    # ROI that's drawn on the segmentation.
+    seg_cp = ImagePlus(seg.getTitle(),ip)
+    seg_cp.setCalibration(seg.getCalibration())
 
     # Compute the pixel statistics for our segmentation image. This will
     # help us set an appropriate threshold for the image.
     seg_stats = seg_cp.getStatistics()
 
-    # Display the segmentation
-    seg_cp.show()
-
     # Set a threshold for the segmentation making sure to label
     # everything that was segmented, in case the wrong color was used
-    # when editing the segmentation.
-    IJ.setThreshold(seg_cp, seg_stats.min + 1, seg_stats.max)
+    # when editing the segmentation. The particle analyzer only looks
+    # at thresholded pixels, so there's no need to convert the
+    # threshold to a mask first.
+    ip.setThreshold(seg_stats.min + 1,seg_stats.max,ImageProcessor.NO_LUT_UPDATE)
 
-    # Convert the threshold to a mask
-    IJ.run('Convert to Mask')
-
-    # Clear ROIs from the ROI Manager
-    ROITools.clearROIs()
+    # Create a hidden ROI Manager for the particle analyzer to add its
+    # ROIs to, so that we don't touch the ROI Manager the user sees
+    segRM = RoiManager(True)
+    ParticleAnalyzer.setRoiManager(segRM)
 
     # Run the particle analyzer to separate the segmentation into
-    # distinct ROIs for each object in your image
-    IJ.run(seg_cp, "Analyze Particles...", "add")
-
-    # Close our copy of the segmentation
-    seg_cp.close()
+    # distinct ROIs for each object in your image. We don't need any
+    # measurements, so give it a results table we'll throw away.
+    try:
+        ParticleAnalyzer(ParticleAnalyzer.ADD_TO_MANAGER,0,ResultsTable(),
+                         0,Double.POSITIVE_INFINITY).analyze(seg_cp,ip)
+
+    # Once we're done, put back the segmentation's original threshold.
+    # We don't close seg_cp, since that would throw away the
+    # segmentation's pixels as well.
+    finally:
+        ParticleAnalyzer.setRoiManager(None)
+        if oldMinThreshold == ImageProcessor.NO_THRESHOLD:
+            ip.resetThreshold()
+        else:
+            ip.setThreshold(oldMinThreshold,oldMaxThreshold,ImageProcessor.NO_LUT_UPDATE)
+    del seg_cp
 
     # Store a list of all of the distinct ROIs drawn on this
     # segmentation
-    segROIs = ROITools.getOpenROIs()
+    segROIs = list(segRM.getRoisAsArray())
+
+    # Close our hidden ROI Manager
+    segRM.close()
 
-    # Clear these ROIs from the ROI Manager
-    ROITools.clearROIs()
+    # Like the ROI Manager, return just the ROI if there was only one
+    # object, or None if there weren't any
+    if len(segROIs) == 1:
+        return segROIs[0]
+    elif len(segROIs) == 0:
+        return None
 
     # Return the final list of ROIs
     return segROIs
@@ -667,17 +1011,22 @@ def ROIs2Segmentation(ROIs,refImg):
     AR Nov 2021
     AR Feb 2022: Make sure final image's calibration matches the
                  reference image
+    AR Oct 2026: Fill each ROI into the mask directly instead of
+                 combining all of the ROIs first
     '''
 
-    # Combine all of the ROIs into a composite ROI
-    combinedROI = ROITools.combineROIs(ROIs)
+    # Create a blank mask the same size as the reference image
+    mask = ByteProcessor(refImg.getWidth(),refImg.getHeight())
 
-    # Superimpose the ROI on top of the reference image
-    refImg.setRoi(combinedROI)
+    # Fill the inside of each ROI into the mask. Filling the ROIs one at
+    # a time gives the same mask as their combination, without having
+    # to merge every ROI's outline into one composite shape first.
+    mask.setValue(255)
+    for ROI in ROIs:
+        mask.fill(ROI)
 
     # Generate the segmentation mask
-    segImg = ImagePlus('Segmentation_' + refImg.getTitle(),
-                       refImg.createRoiMask())
+    segImg = ImagePlus('Segmentation_' + refImg.getTitle(),mask)
 
     # Set the calibration of the segmentation mask to be the same as the
     # reference image
@@ -706,29 +1055,59 @@ def manualRotation(img):
 
     AR Jan 2022: Switched order so that the log appears before the image
                  Enhance contrast of the image to be rotated
+    AR Oct 2026: Preview the rotation on a smaller copy of the image,
+                 then rotate the full image once the angle is chosen,
+                 ask for the interpolation and enlarge options before
+                 rotating, only enhance the contrast of the preview
     '''
 
+    # Import a generic dialog so we can display messages to the user,
+    # and Rotator so we can find the angle the user rotated the image
+    from ij.gui import GenericDialog
+    from ij.plugin.filter import Rotator
+
     # Hide the image provided so that it doesn't get confused with the
     # copy we will make of it
     img.hide()
 
-    # Copy the image provided
-    img_cp = duplicator.run(img)
+    # Store the size of the image provided
+    width = img.getWidth()
+    height = img.getHeight()
+
+    # Work out how much to shrink the image so that its longest side is
+    # at most maxPreviewSize pixels. The rotation preview redraws the
+    # whole image every time the angle changes, so this keeps the
+    # preview responsive for large images.
+    scale = min(1.0,float(maxPreviewSize) / max(width,height))
+
+    # Check to see if the image needs to be shrunk
+    if scale < 1.0:
+
+        # If so, make a smaller copy of the image with bilinear
+        # interpolation, putting back the original interpolation method
+        # afterwards
+        ip = img.getProcessor()
+        oldInterpolation = ip.getInterpolationMethod()
+        ip.setInterpolationMethod(ImageProcessor.BILINEAR)
+        preview = ImagePlus(img.getTitle(),
+                            ip.resize(int(width * scale),int(height * scale)))
+        ip.setInterpolationMethod(oldInterpolation)
+
+    # If the image is already small enough ...
+    else:
+
+        # ... just copy the image provided
+        preview = Duplicator().run(img)
 
     # Set the image name to the same as the original image file
-    img_cp.setTitle(img.getTitle())
+    preview.setTitle(img.getTitle())
 
-    # Display the copied image
-    img_cp.show()
+    # Display the preview image
+    preview.show()
 
-    # Enhance the contrast of the displayed image.
-    ContrastEnhancer().stretchHistogram(img_cp,.35)
-
-    # Instruct ImageJ to rotate the currently opened image 0 degrees. By
-    # doing this, we can set the default values for the angle, grid
-    # size, interpolation and make sure fill and enlarge are both
-    # checked off
-    IJ.run("Rotate... ","angle=0 grid=0 interpolation=Bilinear fill enlarge")
+    # Enhance the contrast of the displayed image, so it's easier to see
+    # while choosing the angle. Only the preview is changed.
+    ContrastEnhancer().stretchHistogram(preview,.35)
 
     # Initialize a GUI to give the user instructions
     gui = GenericDialog('Instructions')
@@ -736,19 +1115,233 @@ def manualRotation(img):
     # Display a message to the user in the ImageJ log instructing them
     # to use the "preview" functionality to find the best angle for the
     # image, then press "OK"
-    gui.addMessage('In the next popup window, you will be able to manually rotate your image. Use the\npreview option to identify the best angle to rotate your image.')
+    gui.addMessage('In the next popup window, you will be able to manually rotate your image. Use the\npreview option to identify the best angle to rotate your image. The full image will\nbe rotated with the options chosen below.')
+
+    # Ask the user how the full image should be rotated once the angle
+    # is chosen. The Rotate dialog doesn't tell us what was chosen in
+    # it, so we ask for these options here instead.
+    gui.addChoice('Interpolation:',ImageProcessor.getInterpolationMethods(),'Bilinear')
+    gui.addCheckbox('Enlarge image to fit result',True)
 
     # Display the gui
     gui.showDialog()
 
+    # Store the options the user chose. The interpolation methods are
+    # listed in the same order as ImageProcessor numbers them.
+    interpolation = gui.getNextChoiceIndex()
+    enlarge = gui.getNextBoolean()
+
+    # Instruct ImageJ to rotate the currently opened image 0 degrees. By
+    # doing this, we can set the default values for the angle and grid
+    # size, match the preview to the options chosen above and make sure
+    # fill is checked off
+    IJ.run("Rotate... ","angle=0 grid=0 interpolation=" +
+           ImageProcessor.getInterpolationMethods()[interpolation] +
+           " fill" + (" enlarge" if enlarge else ""))
+
     # Display the rotator object to the user
     IJ.run("Rotate... ")
 
     # Get the angle that the image was rotated in degrees
-    rotAngle = rotator.getAngle()
+    rotAngle = Rotator().getAngle()
+
+    # Close the preview image now that we know the angle
+    preview.hide()
+    preview.close()
 
-    # Hide the copied image
-    img_cp.hide()
+    # Rotate the full image by the angle the user chose, with the
+    # options they chose
+    img_cp = autoRotation(img,rotAngle,interpolation,enlarge)
+
+    # Return the final rotated image and the angle of rotation
+    return [img_cp,rotAngle]
+
+########################################################################
+############################# autoRotation #############################
+########################################################################
+
+# Define a function that will rotate an image by a known angle
+def autoRotation(img,angle,interpolation=ImageProcessor.BILINEAR,enlarge=True):
+    '''
+    Automatically rotates an image by a set angle
+
+    autoRotation(img,angle,interpolation=ImageProcessor.BILINEAR,
+                 enlarge=True)
+
+        - img (Fiji ImagePlus): Image (or z-stack) you want to rotate
+
+        - angle (Float): Angle in degrees you want to rotate the image.
+                         Uses the same direction as Fiji's Rotate
+                         command, so angles returned by manualRotation
+                         can be used directly.
+
+        - interpolation (Int): Interpolation method to use, one of
+                               ImageProcessor.NONE, BILINEAR or BICUBIC
+                               (default = ImageProcessor.BILINEAR)
+
+        - enlarge (Boolean): Do you want to make the image big enough to
+                             fit the whole rotated image, like Fiji's
+                             Rotate command with the enlarge option?
+                             (default = True)
+
+    OUTPUT rotated copy of the image as a Fiji ImagePlus object. Any new
+    space is filled in with black. The image is not displayed.
+
+    AR Oct 2026
+    '''
+
+    # Import the canvas resizer so we can make room for the rotated
+    # image
+    from ij.plugin import CanvasResizer
+
+    # Copy the image provided, so we don't change it directly
+    img_cp = Duplicator().run(img)
+
+    # Set the image name to the same as the original image file
+    img_cp.setTitle(img.getTitle())
+
+    # Store the current size of the image
+    width = img_cp.getWidth()
+    height = img_cp.getHeight()
+
+    # Work out how big the image needs to be to fit the whole rotated
+    # image
+    theta = radians(angle)
+    newWidth = int(round(abs(width * cos(theta)) + abs(height * sin(theta))))
+    newHeight = int(round(abs(width * sin(theta)) + abs(height * cos(theta))))
+
+    # Grab the stack of slices in our copy of the image
+    stack = img_cp.getStack()
+
+    # Check to see if we want to enlarge the image and it needs to be
+    # enlarged
+    if enlarge and (newWidth > width or newHeight > height):
+
+        # If so, make the canvas bigger around the center of the image
+        newWidth = max(newWidth,width)
+        newHeight = max(newHeight,height)
+        stack = CanvasResizer().expandStack(stack,newWidth,newHeight,
+                                            (newWidth - width) / 2,
+                                            (newHeight - height) / 2)
+        img_cp.setStack(stack)
+
+    # Loop across all slices of the image
+    for s in xrange(1,stack.getSize() + 1):
+
+        # Rotate this slice's pixels directly with the interpolation
+        # method asked for, filling any new space with black. This
+        # avoids displaying the image and running the Rotate macro
+        # command.
+        ip = stack.getProcessor(s)
+        ip.setInterpolationMethod(interpolation)
+        ip.setBackgroundValue(0)
+        ip.rotate(angle)
+
+    # Return the rotated image
+    return img_cp
+
+########################################################################
+########################### autoFindRotation ###########################
+########################################################################
+
+# Define a function that will find the best angle to rotate an image
+# without asking the user
+def autoFindRotation(img,lo=-45.0,hi=45.0,tol=0.1):
+    '''
+    Finds the angle that best straightens an image without asking the
+    user, returns the rotated image and the angle of rotation. The best
+    angle is the one where the columns of the rotated image differ the
+    most in brightness, which happens when the edges of the tissue line
+    up with the columns.
+
+    autoFindRotation(img,lo=-45.0,hi=45.0,tol=0.1)
+
+        - img (ImagePlus): Image you want to rotate
+
+        - lo (Float): Smallest angle in degrees to consider
+                      (default = -45)
+
+        - hi (Float): Largest angle in degrees to consider
+                      (default = 45)
+
+        - tol (Float): How close in degrees the angle found needs to be
+                       to the best angle (default = 0.1)
+
+    OUTPUT list of two elements, like manualRotation. The first element
+    is the rotated image. the second element is the angle that the
+    image was rotated.
+
+    AR Oct 2026
+    '''
+
+    # Store the size of the image provided
+    width = img.getWidth()
+    height = img.getHeight()
+
+    # Make a small copy of the image to score angles on, since the
+    # score only depends on the overall shape of the image. Work with
+    # floating point pixels so that sums don't overflow.
+    scale = min(1.0,float(maxAngleSearchSize) / max(width,height))
+    ip = img.getProcessor()
+    oldInterpolation = ip.getInterpolationMethod()
+    ip.setInterpolationMethod(ImageProcessor.BILINEAR)
+    proxy = ip.resize(max(1,int(width * scale)),max(1,int(height * scale))).convertToFloat()
+    ip.setInterpolationMethod(oldInterpolation)
+
+    # Store the size of our small copy
+    proxyWidth = proxy.getWidth()
+
+    # Define a function that scores how well an angle straightens the
+    # image
+    def score(angle):
+
+        # Rotate a copy of our small image by this angle, filling any
+        # new space with black
+        rotated = proxy.duplicate()
+        rotated.setInterpolationMethod(ImageProcessor.BILINEAR)
+        rotated.setBackgroundValue(0)
+        rotated.rotate(angle)
+
+        # Add up the pixels in each column of the rotated image
+        pixels = list(rotated.getPixels())
+        colSums = [sum(pixels[c::proxyWidth]) for c in xrange(proxyWidth)]
+
+        # Return the variance of the column sums
+        mean = sum(colSums) / len(colSums)
+        return sum((colSum - mean) ** 2 for colSum in colSums) / len(colSums)
+
+    # Search for the angle with the highest score using a golden section
+    # search, which narrows down the range of angles by the same
+    # proportion at each step, reusing one score from the step before
+    invPhi = (sqrt(5.0) - 1.0) / 2.0
+    a = lo + (1.0 - invPhi) * (hi - lo)
+    b = lo + invPhi * (hi - lo)
+    scoreA = score(a)
+    scoreB = score(b)
+
+    # Keep narrowing down the range until it's small enough
+    while hi - lo > tol:
+
+        # If the lower angle scores better, the best angle must be below
+        # the upper angle
+        if scoreA >= scoreB:
+            hi, b, scoreB = b, a, scoreA
+            a = lo + (1.0 - invPhi) * (hi - lo)
+            scoreA = score(a)
+
+        # Otherwise, the best angle must be above the lower angle
+        else:
+            lo, a, scoreA = a, b, scoreB
+            b = lo + invPhi * (hi - lo)
+            scoreB = score(b)
+
+    # Store the angle in the middle of our final range
+    rotAngle = (lo + hi) / 2.0
+
+    # Rotate the full image by this angle, and enhance its contrast like
+    # manualRotation does
+    img_cp = autoRotation(img,rotAngle)
+    ContrastEnhancer().stretchHistogram(img_cp,.35)
 
     # Return the final rotated image and the angle of rotation
     return [img_cp,rotAngle]
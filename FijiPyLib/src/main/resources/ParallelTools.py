@@ -0,0 +1,114 @@
+'''
+ParallelTools Module
+
+This module contains tools for running work on several threads at once
+
+    parallelTask(func,item)
+
+        - Class of tasks that call a function on a single item, which
+          can be submitted to a java thread pool
+
+    parallelMap(func,items,nThreads=None)
+
+        - Calls a function on every item of a list, several items at a
+          time, returning the results in order
+
+'''
+
+########################################################################
+########################### IMPORT PACKAGES ############################
+########################################################################
+
+# Import java's thread pools and Callable interface so we can run tasks
+# in parallel, and Runtime so we can check how many processors are
+# available
+from java.util.concurrent import Executors, Callable
+from java.lang import Runtime
+
+########################################################################
+############################# parallelTask #############################
+########################################################################
+
+# Define a class of tasks that call a function on a single item, so that
+# they can be run by a java thread pool
+class parallelTask(Callable):
+    '''
+    Class of tasks that call a function on a single item, which can be
+    submitted to a java thread pool
+
+    parallelTask(func,item)
+
+        - func (Function): Function to call
+
+        - item: Argument to call func with
+
+    AR Oct 2026
+    '''
+
+    # Initialize object
+    def __init__(self,func,item):
+
+        # Store the function and the item to call it with
+        self.func = func
+        self.item = item
+
+    # Define a method that calls the function when the task is run
+    def call(self):
+
+        # Return the result of calling the function on the item
+        return self.func(self.item)
+
+########################################################################
+############################# parallelMap ##############################
+########################################################################
+
+# Define a function that calls a function on many items at once
+def parallelMap(func,items,nThreads=None):
+    '''
+    Calls a function on every item of a list, several items at a time,
+    returning the results in order
+
+    parallelMap(func,items,nThreads=None)
+
+        - func (Function): Function to call on each item. It must be
+                           safe to call from several threads at once.
+
+        - items (List): Items to call func on
+
+        - nThreads (Int): Most items to work on at the same time
+                          (default = None, as many as there are
+                          processors available)
+
+    OUTPUT list of the results of func for each item, in the same order
+    as items. If func fails on any item, the error is raised here
+    (wrapped in a java ExecutionException if it happened on another
+    thread).
+
+    AR Oct 2026
+    '''
+
+    # Store the items in a list, in case we were given a generator
+    items = list(items)
+
+    # If there's only one item, there's nothing to do in parallel, so
+    # just call the function here
+    if len(items) < 2:
+        return [func(item) for item in items]
+
+    # Use one thread per item, up to the number of processors
+    # available, unless told otherwise
+    if nThreads is None:
+        nThreads = Runtime.getRuntime().availableProcessors()
+    nThreads = max(1,min(len(items),nThreads))
+
+    # Start a pool of threads so that several items can be worked on at
+    # the same time
+    pool = Executors.newFixedThreadPool(nThreads)
+
+    # Call the function on each item in the pool, then wait for all of
+    # the results in order. Shut down the pool once we're done with it.
+    try:
+        futures = [pool.submit(parallelTask(func,item)) for item in items]
+        return [future.get() for future in futures]
+    finally:
+        pool.shutdown()
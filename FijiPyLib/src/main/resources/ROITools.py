@@ -235,8 +235,9 @@ class gridOfFields:
         maxProj = imgStack.maxProj()
         del imgStack
 
-        # Normalize the pixel intensities of the max projection
-        maxProj = ImageProcessing.normalizeImg(maxProj)
+        # Normalize the pixel intensities of the max projection. We
+        # don't need the original projection, so normalize it in place.
+        maxProj = ImageProcessing.normalizeImg(maxProj,inPlace=True)
 
         '''
         # Normalize the image so that the pixel intensities are brighter
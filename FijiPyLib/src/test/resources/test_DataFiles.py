@@ -0,0 +1,140 @@
+'''
+Tests for the DataFiles Module
+
+DataFiles only uses plain python, so these tests can be run with
+CPython (2 or 3) as well as from Fiji
+
+    python -m pytest FijiPyLib/src/test/resources/test_DataFiles.py
+
+    csv2dictTests
+
+        - Checks how csv2dict reads csv files and remembers files it
+          has already read
+
+AR Oct 2026
+'''
+
+########################################################################
+############################ IMPORT PACKAGES ###########################
+########################################################################
+
+# Import unittest so we can organize and run our tests
+import unittest
+
+# Import os, sys and tempfile so we can find the library and save csv
+# files to a temporary folder
+import os
+import sys
+import tempfile
+
+# Import shutil so we can remove the temporary folder afterwards
+import shutil
+
+# Add the library to the python path, so we can import it when the tests
+# are run from outside Fiji
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               os.pardir,os.pardir,'main','resources'))
+
+# Import the module we're testing
+import DataFiles
+
+########################################################################
+############################# csv2dictTests ############################
+########################################################################
+
+# Define the tests for csv2dict
+class csv2dictTests(unittest.TestCase):
+    '''
+    Checks how csv2dict reads csv files and remembers files it has
+    already read
+
+    AR Oct 2026
+    '''
+
+    # Make a temporary folder to save our csv files in, and start each
+    # test with an empty cache
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.csvPath = os.path.join(self.tmpDir,'data.csv')
+        for cacheKey in DataFiles.csvCache.keys():
+            DataFiles.csvCache.remove(cacheKey)
+
+    # Remove the temporary folder after each test
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+    # Write text directly to our csv file
+    def writeText(self,text):
+        with open(self.csvPath,'w') as csvFile:
+            csvFile.write(text)
+
+    # Values are read as strings and transposed into columns
+    def testTranspose(self):
+        self.writeText('a,b\n1,x\n2,y\n')
+        self.assertEqual(DataFiles.csv2dict(self.csvPath),
+                         {'a': ['1','2'], 'b': ['x','y']})
+
+    # Blank lines are skipped, and short rows are padded with None
+    def testRaggedRows(self):
+        self.writeText('a,b\n1,x\n\n2\n')
+        self.assertEqual(DataFiles.csv2dict(self.csvPath),
+                         {'a': ['1','2'], 'b': ['x',None]})
+
+    # A file with only column names gives empty columns
+    def testHeaderOnly(self):
+        self.writeText('a,b\n')
+        self.assertEqual(DataFiles.csv2dict(self.csvPath),{'a': [], 'b': []})
+
+    # Writing and reading a dictionary gives back the same values
+    def testRoundTrip(self):
+        DataFiles.dict2csv({'a': [1,2.5], 'b': ['x','y,z']},self.csvPath)
+        self.assertEqual(DataFiles.csv2dict(self.csvPath),
+                         {'a': ['1','2.5'], 'b': ['x','y,z']})
+
+    # Reading the same file again uses the cache instead of the file
+    def testCacheHit(self):
+        self.writeText('a\n1\n')
+        DataFiles.csv2dict(self.csvPath)
+        origReadCSV = DataFiles.readCSV
+        DataFiles.readCSV = None
+        try:
+            self.assertEqual(DataFiles.csv2dict(self.csvPath),{'a': ['1']})
+        finally:
+            DataFiles.readCSV = origReadCSV
+
+    # Changing the dictionary we're given doesn't change the cache
+    def testCopyOnReturn(self):
+        self.writeText('a\n1\n')
+        DataFiles.csv2dict(self.csvPath)['a'].append('2')
+        self.assertEqual(DataFiles.csv2dict(self.csvPath),{'a': ['1']})
+
+    # A file rewritten by dict2csv is read again, even if its
+    # modification time doesn't change
+    def testRewriteWithDict2csv(self):
+        DataFiles.dict2csv({'a': [1]},self.csvPath)
+        mtime = os.path.getmtime(self.csvPath)
+        DataFiles.csv2dict(self.csvPath)
+        DataFiles.dict2csv({'a': [2]},self.csvPath)
+        os.utime(self.csvPath,(mtime,mtime))
+        self.assertEqual(DataFiles.csv2dict(self.csvPath),{'a': ['2']})
+
+    # A file rewritten some other way is read again if its size changes,
+    # even if its modification time doesn't
+    def testRewriteWithNewSize(self):
+        self.writeText('a\n1\n')
+        mtime = os.path.getmtime(self.csvPath)
+        DataFiles.csv2dict(self.csvPath)
+        self.writeText('a\n10\n')
+        os.utime(self.csvPath,(mtime,mtime))
+        self.assertEqual(DataFiles.csv2dict(self.csvPath),{'a': ['10']})
+
+    # forgetCSV removes every cached version of a file
+    def testForgetCSV(self):
+        self.writeText('a\n1\n')
+        DataFiles.csv2dict(self.csvPath)
+        DataFiles.forgetCSV(self.csvPath)
+        self.assertEqual(DataFiles.csvCache.keys(),[])
+
+# Run the tests when this file is run directly
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+'''
+Tests for the ImageFiles Module
+
+Run these tests from Fiji's script editor (with the language set to
+Python) or from the command line with
+
+    ImageJ --headless --run test_ImageFiles.py
+
+These tests need Fiji's java libraries, so they are skipped when run
+with CPython
+
+    saveCompressedImgTests
+
+        - Checks that images saved with saveCompressedImg read back with
+          the same pixel type and pixel values
+
+AR Oct 2026
+'''
+
+########################################################################
+############################ IMPORT PACKAGES ###########################
+########################################################################
+
+# Import unittest so we can organize and run our tests
+import unittest
+
+# Import os and tempfile so we can save images to a temporary folder
+import os
+import tempfile
+
+# Import shutil so we can remove the temporary folder afterwards
+import shutil
+
+# Skip these tests if we're not running inside Fiji
+try:
+    import ij
+except ImportError:
+    raise unittest.SkipTest('saveCompressedImg tests need to be run from Fiji')
+
+# Import jarray so we can make java arrays of pixels
+import jarray
+
+# Import ImageJ's images, stacks and processors so we can build test
+# images
+from ij import ImagePlus, ImageStack
+from ij.process import ShortProcessor, FloatProcessor
+
+# Import bio-formats' reader and format tools so we can check how the
+# saved images are labelled, and BF so we can read them back
+from loci.formats import ImageReader, FormatTools
+from loci.plugins import BF
+
+# Import the functions we're testing
+from ImageTools.ImageFiles import getMetadata, saveCompressedImg
+
+########################################################################
+######################### saveCompressedImgTests #######################
+########################################################################
+
+# Define the tests for saveCompressedImg
+class saveCompressedImgTests(unittest.TestCase):
+    '''
+    Checks that images saved with saveCompressedImg read back with the
+    same pixel type and pixel values
+
+    AR Oct 2026
+    '''
+
+    # Make a temporary folder to save our images in before each test
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+
+    # Remove the temporary folder after each test
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+    # Save an image, read it back and compare it to the original
+    def roundTrip(self,processors,pixelType):
+
+        # Build a z-stack out of the processors
+        stack = ImageStack(processors[0].getWidth(),processors[0].getHeight())
+        for ip in processors:
+            stack.addSlice(ip)
+        img = ImagePlus('roundTrip',stack)
+
+        # Save the image with its metadata
+        outFile = os.path.join(self.tmpDir,'roundTrip.tif')
+        saveCompressedImg(img,getMetadata(img),outFile)
+
+        # Check that the file is labelled with the pixel type we expect
+        reader = ImageReader()
+        try:
+            reader.setId(outFile)
+            self.assertEqual(reader.getPixelType(),pixelType)
+            self.assertEqual(reader.getImageCount(),len(processors))
+        finally:
+            reader.close()
+
+        # Read the image back and check that each plane's pixels match
+        savedStack = BF.openImagePlus(outFile)[0].getStack()
+        for p, ip in enumerate(processors):
+            self.assertEqual(list(savedStack.getPixels(p+1)),list(ip.getPixels()))
+
+    # 16-bit pixels above 32767 should not come back negative
+    def test16Bit(self):
+
+        # Java's shorts are signed, so store unsigned 16-bit values the
+        # way ImageJ does, wrapped around into the negative numbers
+        def shorts(vals):
+            return jarray.array([v - 65536 if v > 32767 else v for v in vals],'h')
+
+        self.roundTrip([ShortProcessor(4,3,shorts([i * 5000 for i in range(12)]),None),
+                        ShortProcessor(4,3,shorts([65535 - i for i in range(12)]),None)],
+                       FormatTools.UINT16)
+
+    # 32-bit pixels should come back as the same floats
+    def test32Bit(self):
+        self.roundTrip([FloatProcessor(4,3,jarray.array([i * 0.25 - 1 for i in range(12)],'f')),
+                        FloatProcessor(4,3,jarray.array([1e6 + i for i in range(12)],'f'))],
+                       FormatTools.FLOAT)
+
+# Run the tests
+unittest.TextTestRunner(verbosity=2).run(
+    unittest.TestLoader().loadTestsFromTestCase(saveCompressedImgTests))
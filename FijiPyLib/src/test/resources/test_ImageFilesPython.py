@@ -0,0 +1,181 @@
+'''
+Tests for the plain python parts of the ImageFiles Module
+
+These functions don't need Fiji, so these tests can be run with CPython
+(2 or 3) as well as from Fiji
+
+    python -m pytest FijiPyLib/src/test/resources/test_ImageFilesPython.py
+
+ImageFiles imports java's file tools and ParallelTools when it's loaded.
+Outside of Fiji, these are replaced with stand-ins before ImageFiles is
+imported. None of the functions tested here use java's file tools, and
+the ParallelTools stand-in runs each task one after another.
+
+    getFieldNumberTests
+
+        - Checks how getFieldNumber finds the field of view number in a
+          file name
+
+    findImgsInDirTests
+
+        - Checks that findImgsInDir stops once it has found as many
+          files as it was asked for
+
+AR Oct 2026
+'''
+
+########################################################################
+############################ IMPORT PACKAGES ###########################
+########################################################################
+
+# Import unittest so we can organize and run our tests
+import unittest
+
+# Import os and sys so we can find the library, and tempfile and shutil
+# so we can make folders of files to search through
+import os
+import sys
+import tempfile
+import shutil
+
+# Import types so we can make stand-ins for modules only found in Fiji
+import types
+
+# Add the library to the python path, so we can import it when the tests
+# are run from outside Fiji
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               os.pardir,os.pardir,'main','resources'))
+
+# Check to see if we're running inside Fiji
+try:
+    import java
+
+# If we're not, make stand-ins for the java modules and ParallelTools
+except ImportError:
+
+    # Store the stand-in for each module by its name
+    standIns = {'java': types.ModuleType('java'),
+                'java.nio': types.ModuleType('java.nio'),
+                'java.nio.file': types.ModuleType('java.nio.file'),
+                'java.io': types.ModuleType('java.io'),
+                'ParallelTools': types.ModuleType('ParallelTools')}
+
+    # ImageFiles only needs these java names to exist when it's loaded
+    standIns['java.nio.file'].Files = None
+    standIns['java.nio.file'].Paths = None
+    standIns['java.io'].IOException = IOError
+
+    # Call the function on each item in turn, instead of in parallel
+    standIns['ParallelTools'].parallelMap = lambda func, items, nThreads=None: [func(item) for item in items]
+
+    # Let python find the stand-ins when ImageFiles imports them
+    sys.modules.update(standIns)
+
+# Import the module we're testing
+from ImageTools import ImageFiles
+
+# ImageFiles checks for unicode paths, which CPython 3 calls str
+if sys.version_info[0] >= 3:
+    ImageFiles.unicode = str
+
+########################################################################
+########################## getFieldNumberTests #########################
+########################################################################
+
+# Define the tests for getFieldNumber
+class getFieldNumberTests(unittest.TestCase):
+    '''
+    Checks how getFieldNumber finds the field of view number in a file
+    name
+
+    AR Oct 2026
+    '''
+
+    # The number between 'Field-' and the next underscore is returned as
+    # an integer
+    def testNumber(self):
+        self.assertEqual(ImageFiles.getFieldNumber('Marker_Field-12_Labels.tif'),12)
+
+    # If there are several field of view numbers, the last one is used
+    def testLastNumber(self):
+        self.assertEqual(ImageFiles.getFieldNumber('Field-3_Fields/Field-7_Labels.tif'),7)
+
+    # A 'Field-' that isn't followed by digits and an underscore is
+    # skipped, and we keep searching before it
+    def testSkipNonNumbers(self):
+        self.assertEqual(ImageFiles.getFieldNumber('Field-5_Labels_Field-x.tif'),5)
+        self.assertEqual(ImageFiles.getFieldNumber('Field-5_Labels_Field-8.tif'),5)
+
+    # Names without a field of view number raise a ValueError
+    def testNoNumber(self):
+        for fieldName in ['Labels.tif','Field-12.tif','Field-_Labels.tif']:
+            self.assertRaises(ValueError,ImageFiles.getFieldNumber,fieldName)
+
+    # getFieldNumbers finds the number in each name, in order
+    def testNumbers(self):
+        self.assertEqual(ImageFiles.getFieldNumbers(['Field-2_a.tif','Field-10_b.tif']),[2,10])
+
+########################################################################
+########################### findImgsInDirTests #########################
+########################################################################
+
+# Define the tests for findImgsInDir's limit option
+class findImgsInDirTests(unittest.TestCase):
+    '''
+    Checks that findImgsInDir stops once it has found as many files as
+    it was asked for
+
+    AR Oct 2026
+    '''
+
+    # Make a temporary folder of files, with files in sub folders of
+    # several depths
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        for fileName in ['a.tif','b.tif','c.txt',
+                         os.path.join('sub1','d.tif'),
+                         os.path.join('sub1','e.tif'),
+                         os.path.join('sub1','deep','f.tif'),
+                         os.path.join('sub2','g.tif')]:
+            filePath = os.path.join(self.tmpDir,fileName)
+            if not os.path.isdir(os.path.dirname(filePath)):
+                os.makedirs(os.path.dirname(filePath))
+            open(filePath,'w').close()
+
+    # Remove the temporary folder after each test
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+    # Search the temporary folder, always getting back a list
+    def find(self,**kwargs):
+        return ImageFiles.findImgsInDir(self.tmpDir,fileType='tif',
+                                        unwrapSingle=False,**kwargs)
+
+    # A limit gives back the first files a full search would find
+    def testLimit(self):
+        allFiles = self.find()
+        self.assertEqual(len(allFiles),2)
+        for limit in [1,2]:
+            self.assertEqual(self.find(limit=limit),allFiles[:limit])
+
+    # The same holds when searching sub folders, whichever depth the
+    # limit is reached at
+    def testLimitSubDirs(self):
+        allFiles = self.find(searchSubDirs=True)
+        self.assertEqual(len(allFiles),6)
+        for limit in range(1,7):
+            self.assertEqual(self.find(searchSubDirs=True,limit=limit),allFiles[:limit])
+
+    # A limit larger than the number of matching files gives back all
+    # of them
+    def testLimitTooLarge(self):
+        self.assertEqual(self.find(searchSubDirs=True,limit=100),self.find(searchSubDirs=True))
+
+    # With a limit of one, a single path is returned if asked for
+    def testLimitUnwrap(self):
+        found = ImageFiles.findImgsInDir(self.tmpDir,fileType='tif',limit=1)
+        self.assertEqual(found,self.find(limit=1)[0])
+
+# Run the tests when this file is run directly
+if __name__ == '__main__':
+    unittest.main()
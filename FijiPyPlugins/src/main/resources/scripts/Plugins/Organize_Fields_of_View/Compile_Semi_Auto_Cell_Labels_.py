@@ -541,8 +541,10 @@ for channelName in channelNames:
     channelSourceImg.hide()
 
     # Compute the maximum intensity projection of this image and then
-    # enhance the brightness/contrast
-    channelSourceMaxProj = ImageProcessing.normalizeImg(ImageProcessing.zStack(channelSourceImg).maxProj())
+    # enhance the brightness/contrast. The projection is only used here,
+    # so it can be normalized in place.
+    channelSourceMaxProj = ImageProcessing.normalizeImg(ImageProcessing.zStack(channelSourceImg).maxProj(),
+                                                        inPlace=True)
     channelSourceImg.close()
     del channelSourceImg
 
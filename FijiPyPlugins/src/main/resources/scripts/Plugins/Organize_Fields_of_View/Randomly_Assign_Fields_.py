@@ -126,7 +126,7 @@ del initialsTextFieldLabels, defaultInitials
 fieldSize = ImageFiles.findSubDirs(fieldsDir)
 
 # Check to see if fields of multiple sizes have been generated
-if isinstance(fieldSize,(tuple,list)):
+if len(fieldSize) > 1:
 
     # If the user has made fields of view of more than one size, we'll
     # need to ask which field of view size they would like to use. Below
@@ -134,6 +134,12 @@ if isinstance(fieldSize,(tuple,list)):
     fieldSize = UIs.whichChoiceUI('Which field of view size would you like to process?',
                                   'Field of view size:',fieldSize)
 
+# If there's only one field of view size ...
+else:
+
+    # ... use it
+    fieldSize = fieldSize[0]
+
 ########################################################################
 ################# IDENTIFY DESIRED MARKERS TO QUANTIFY #################
 ########################################################################
@@ -151,7 +157,7 @@ del markersImaged
 
 # Create a list of lists of all fields of view image files for each
 # of the markers to assign to researchers
-fieldsByMarker = [ImageFiles.findImgsInDir(os.path.join(fieldsDir,fieldSize,marker)) for marker in markers2Assign]
+fieldsByMarker = ImageFiles.findImgsInDirs([os.path.join(fieldsDir,fieldSize,marker) for marker in markers2Assign])
 
 ########################################################################
 ########### RANDOMIZE ALL ROWS AND COLUMNS OF FIELDS OF VIEW ###########
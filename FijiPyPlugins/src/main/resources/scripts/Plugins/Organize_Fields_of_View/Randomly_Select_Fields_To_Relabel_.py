@@ -52,11 +52,6 @@ from shutil import copyfile
 # directories will contain all of the original labelings made by each RA
 origRALabelDirs = ImageFiles.findSubDirs(inputDir)
 
-# Make sure that origRALabelDirs is a list. It will be a single string
-# if there was only one RA 
-if not isinstance(origRALabelDirs,list):
-	origRALabelDirs = [origRALabelDirs]
-
 # Look inside the first RA folder and get all of it's sub-directories
 origSubDirs = ImageFiles.findSubDirs(os.path.join(inputDir,origRALabelDirs[0]))
 
@@ -81,10 +76,11 @@ for origRADir in origRALabelDirs:
 
     # Get all of the unlabeled field file names within the first
     # unlabeled field directory
-    filesAssigned2RA = ImageFiles.findImgsInDir(os.path.join(inputDir,origRADir,unlabeledFieldDirs[0]))
+    filesAssigned2RA = ImageFiles.findImgsInDir(os.path.join(inputDir,origRADir,unlabeledFieldDirs[0]),
+                                                unwrapSingle=False)
 
     # Get a list of all of the field numbers assigned to this RA
-    fieldsAssigned2RA = [ImageFiles.getFieldNumber(fileAssigned) for fileAssigned in filesAssigned2RA]
+    fieldsAssigned2RA = ImageFiles.getFieldNumbers(filesAssigned2RA)
 
     # Randomly re-order this list of field numbers associated with this
     # RA
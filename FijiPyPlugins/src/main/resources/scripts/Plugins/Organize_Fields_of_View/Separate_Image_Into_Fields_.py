@@ -230,11 +230,10 @@ def crop_norm_save_fov(img2separate,fieldOfViewROI,outDir):
 	# Crop the field of view from the larger image
 	field = ROITools.getImgInROI(img2separate,fieldOfViewROI)
 
-	# Normalize this field of view
-	normalizedField = ImageProcessing.normalizeImg(field)
-
-	# Clear the field of view from memory
-	field.close()
+	# Normalize this field of view. We don't need the cropped field of
+	# view afterwards, so normalize it in place rather than copying it.
+	normalizedField = ImageProcessing.normalizeImg(field,inPlace=True)
+	del field
 
 	# Save this normalized field of view
 	IJ.save(normalizedField,os.path.join(outDir,normalizedField.getTitle()))
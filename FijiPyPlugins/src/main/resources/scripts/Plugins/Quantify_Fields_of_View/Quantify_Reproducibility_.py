@@ -133,8 +133,9 @@ for f in range(len(relabeledFields)):
                                 origLabelDir[origLabelDir.rindex(os.path.sep)+1:])
 
     # Check to make sure that we are able to locate the original
-    # segmentation file
-    if not len(ImageFiles.findImgsInDir(os.path.join(origLabelDir,'*_Segmentations'),None,'.+-Segmentation_Field-{}_.*'.format(nFoV))) > 0:
+    # segmentation file. We only need to know whether one exists, so
+    # stop searching as soon as one is found.
+    if not ImageFiles.findImgsInDir(os.path.join(origLabelDir,'*_Segmentations'),None,'.+-Segmentation_Field-{}_.*'.format(nFoV),limit=1):
         # Move to the next field of view
         continue
     # Find the original DAPI segmentation and field quantification csv
@@ -238,9 +238,11 @@ fieldQuants['Field_of_View_Number'] = [iFov]
 # Segment the nuclear maximum intensity projection
 nucSeg = ImageProcessing.segmentImg(nucMaxProj)
 
-# Overlay the segmentation on top of the maximum intensity projection
-nucSegOverlay = ImageDisplay.overlayImages([nucMaxProj,nucSeg])
-nucSeg.close()
+# Overlay the segmentation on top of the maximum intensity projection.
+# We don't need the segmentation afterwards, so it can be merged
+# directly without being copied first.
+nucSegOverlay = ImageDisplay.overlayImages([nucMaxProj,nucSeg],
+                                           copy=[True,False])
 del nucSeg
 
 # Get a blurred image of the nuclear maximum intensity projection that
@@ -349,11 +351,11 @@ except:
 ########################################################################
 
 # Store the path to each of the images of cells that need to be labeled
-markers2LabelPaths = [ImageFiles.findImgsInDir(os.path.join(dataDir,
-                                                            '{}_Unlabeled_Fields'.format(marker)),
-                                               None,
-                                               '{}{}Field-'.format(os.path.sep,
-                                                                   n_fov)) for marker in markers2label]
+markers2LabelPaths = ImageFiles.findImgsInDirs([os.path.join(dataDir,
+                                                             '{}_Unlabeled_Fields'.format(marker)) for marker in markers2label],
+                                                None,
+                                                '{}{}Field-'.format(os.path.sep,
+                                                                    n_fov))
 del marker
 
 # Store the name of the first file in our list
@@ -446,10 +448,11 @@ if nCells2Label > 0:
     [nucROIs[nuc].setName(predictedNucLabels[nuc]) for nuc in range(nCells2Label)]
     del predictedNucLabels, nuc
 
-    # Merge all of the shortened z-stacks for all markers in this image
-    mergedShortZStack = ImageDisplay.overlayImages(markers2LabelShortStacks + [nucShortZStack])
-    [markers2LabelShortStacks[m].close() for m in range(len(markers2LabelShortStacks))]
-    nucShortZStack.close()
+    # Merge all of the shortened z-stacks for all markers in this image.
+    # We don't need the shortened z-stacks afterwards, so they can be
+    # merged directly without being copied first.
+    mergedShortZStack = ImageDisplay.overlayImages(markers2LabelShortStacks + [nucShortZStack],
+                                                   copy=False)
     del markers2LabelShortStacks, nucShortZStack
 
     # Display the merged short stack
@@ -116,13 +116,10 @@ nucSegDir = nucSegDir[0]
 
 # Get a list of all of the nuclear segmentations in this directory
 nucSegs = ImageFiles.findImgsInDir(os.path.join(frstRAPath,nucSegDir),
-                                   None,'-Segmentation_Field-')
+                                   None,'-Segmentation_Field-',
+                                   unwrapSingle=False)
 del frstRAPath, nucSegDir
 
-# Check to make sure nucSegs is a list and not just a character array
-if not isinstance(nucSegs,list):
-    nucSegs = [nucSegs]
-
 # Open the first nuclear segmentation as an example to get the physical
 # units of the field of view ROI
 nucSeg = ImagePlus(nucSegs[0])
@@ -176,17 +173,13 @@ for subDir in RADirs:
     # nuclear ROIs within the field of view
     fovNucSegsPaths = ImageFiles.findImgsInDir(os.path.join(RADir,'Cell_Labeling_By_Field'),
                                                None,
-                                               'Cell_Labeling_Field')
+                                               'Cell_Labeling_Field',
+                                               unwrapSingle=False)
 
     # Check to make sure there's at least one file containing nuclear
     # labels
     if len(fovNucSegsPaths) > 0:
 
-        # Make sure that there is more than one path listed
-        if not isinstance(fovNucSegsPaths,list):
-
-            fovNucSegsPaths = [fovNucSegsPaths]
-
         # Loop across all sets of nuclear segmentations
         for fovNucSegsPath in fovNucSegsPaths:
 